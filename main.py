@@ -4,36 +4,65 @@ Entry point for AI Health Coach.
 Runs the chat loop and optionally fetches recent data if cache is empty.
 """
 
-from datetime import date, timedelta
+import argparse
+import sys
+import time
 from src.chatbot.cli_chat import main as chat_main
+from src.data.bootstrap import bootstrap
 from src.data.cache import get_latest_metrics, init_db
-from src.api.client import fetch_daily_metrics, get_token, get_email
-from src.data.parser import parse_daily_metrics
-from src.data.cache import insert_metrics
 
 
 def ensure_data():
-    """Check if cache has data; if not, fetch last 7 days."""
+    """Check if cache has data; if not, start fetching the last 7 days in the background."""
     init_db()
     latest = get_latest_metrics()
     if not latest:
-        print("No data found in cache. Fetching last 7 days of data...")
-        token = get_token()
-        email = get_email()
-        today = date.today()
-        for i in range(1, 8):
-            day = today - timedelta(days=i)
-            try:
-                print(f"Fetching {day}...")
-                resp = fetch_daily_metrics(day, token, email)
-                metrics = parse_daily_metrics(resp)
-                insert_metrics(day, metrics, raw_json=resp)
-                print(f"Stored {day}")
-            except Exception as e:
-                print(f"Error fetching {day}: {e}")
-        print("Initial data fetch complete.")
+        # stderr, so it never mixes with --batch results on stdout
+        print("No data found in cache. Syncing the last 7 days in the background "
+              "(most recent first); /sync shows progress.", file=sys.stderr)
+        bootstrap.start(days=7)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="AI Health Coach")
+    parser.add_argument('--serve', action='store_true', help='serve the HTTP/JSON API instead of the chat loop')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print an import-time breakdown of launch to first prompt, then exit')
+    parser.add_argument('--batch', metavar='FILE',
+                        help="answer a JSONL file of queries ('-' for stdin) and print JSONL results; "
+                             "python src/chatbot/batch.py --help lists more options")
+    parser.add_argument('--trace', metavar='FILE', help='write every timed stage to FILE as JSON lines')
+    # Set by --profile-startup on the process it measures
+    parser.add_argument('--startup-probe', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from src.perf.startup import profile_startup
+        profile_startup(__file__, ['--startup-probe'])
+        sys.exit(0)
+
+    if args.trace:
+        from src.perf.spans import recorder
+        recorder.start_trace(args.trace)
+
+    start = time.perf_counter()
     ensure_data()
-    chat_main()
\ No newline at end of file
+    ensure_data_seconds = time.perf_counter() - start
+
+    if args.serve:
+        import asyncio
+        from src.chatbot.server import serve
+        asyncio.run(serve(args.host, args.port))
+    elif args.batch:
+        from src.chatbot.batch import main as batch_main
+        # Answers should see the whole bootstrap, not a partial sync
+        bootstrap.wait()
+        batch_main([args.batch])
+    elif args.startup_probe:
+        from src.chatbot.cli_chat import startup_timings
+        from src.perf.startup import report_ready
+        chat_main(on_ready=lambda: report_ready(dict(startup_timings, ensure_data=ensure_data_seconds)))
+    else:
+        chat_main()
\ No newline at end of file
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+"""
+Benchmark the NLU front end (intent classifier, metric and time range extraction).
+Replays a held-out query corpus through parse_query and reports per-stage
+p50/p95/p99 latency, throughput, model memory footprint and per-intent
+accuracy/fallback rates, including how accuracy behaves around the confidence
+threshold. Results are written as JSON so runs can be diffed between commits.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.chatbot.intent_classifier import IntentClassifier, normalize_query
+from src.chatbot.nlu import parse_query
+from src.perf.stats import summarize
+
+STAGES = ['normalize', 'intent', 'metric', 'time_range', 'total']
+THRESHOLD_SWEEP = [0.3, 0.35, 0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7]
+
+
+def load_corpus(path, holdout):
+    """Load (query, intent) pairs; with holdout, use the same test split as training."""
+    df = pd.read_csv(path)
+    if holdout:
+        _, X_test, _, y_test = train_test_split(
+            df['query'], df['intent'], test_size=0.2, random_state=42, stratify=df['intent']
+        )
+        return list(X_test), list(y_test)
+    return list(df['query']), list(df['intent'])
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_model(models_dir, cache_size):
+    """Load the classifier while measuring allocated memory and on-disk size."""
+    tracemalloc.start()
+    model = IntentClassifier.load(models_dir, cache_size=cache_size)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # load() serves the compact export when there is one (and writes it when there isn't)
+    compact = os.path.join(models_dir, 'intent_compact.npz')
+    files = [compact] if os.path.exists(compact) else [
+        os.path.join(models_dir, name) for name in ('vectorizer.pkl', 'intent_classifier.pkl')]
+    disk = sum(os.path.getsize(path) for path in files)
+    return model, {'heap_bytes': current, 'peak_load_bytes': peak, 'disk_bytes': disk}
+
+
+def bench_latency(model, queries, repeat):
+    stage_times = {stage: [] for stage in STAGES}
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            parsed = parse_query(query, model)
+            for stage in STAGES:
+                stage_times[stage].append(parsed.timings[stage])
+    elapsed = time.perf_counter() - start
+    n = len(queries) * repeat
+    return {stage: summarize(times) for stage, times in stage_times.items()}, n / elapsed
+
+
+def bench_batch(model, queries):
+    start = time.perf_counter()
+    model.predict_many(queries)
+    elapsed = time.perf_counter() - start
+    return {'queries': len(queries), 'seconds': elapsed, 'queries_per_sec': len(queries) / elapsed}
+
+
+def accuracy_report(model, queries, labels):
+    """Per-intent accuracy/fallback at the model threshold, plus confidence bins and a threshold sweep."""
+    matrix = model.vectorizer.transform([normalize_query(q) for q in queries])
+    probas = model.classifier.predict_proba(matrix)
+    best = probas.max(axis=1)
+    predicted = model.classifier.classes_[probas.argmax(axis=1)]
+    labels = np.asarray(labels)
+    correct = predicted == labels
+    accepted = best >= model.threshold
+
+    per_intent = {}
+    for intent in sorted(set(labels)):
+        mask = labels == intent
+        per_intent[intent] = {
+            'count': int(mask.sum()),
+            # a fallback to the LLM counts as a miss for the intent
+            'accuracy': float((correct & accepted)[mask].mean()),
+            'fallback_rate': float((~accepted)[mask].mean()),
+        }
+
+    bins = []
+    for i in range(10):
+        lo, hi = i / 10, (i + 1) / 10
+        mask = (best >= lo) & ((best < hi) if i < 9 else (best <= hi))
+        bins.append({
+            'confidence': f"{lo:.1f}-{hi:.1f}",
+            'count': int(mask.sum()),
+            'accuracy': float(correct[mask].mean()) if mask.any() else None,
+        })
+
+    sweep = []
+    for threshold in THRESHOLD_SWEEP:
+        kept = best >= threshold
+        sweep.append({
+            'threshold': threshold,
+            'fallback_rate': float((~kept).mean()),
+            'accepted_accuracy': float(correct[kept].mean()) if kept.any() else None,
+        })
+
+    return {
+        'threshold': model.threshold,
+        'overall_accuracy': float((correct & accepted).mean()),
+        'overall_fallback_rate': float((~accepted).mean()),
+        'per_intent': per_intent,
+        'confidence_bins': bins,
+        'threshold_sweep': sweep,
+    }
+
+
+def print_report(results, baseline=None):
+    print(f"\nCorpus: {results['corpus']['queries']} queries x {results['corpus']['repeat']} passes")
+    print(f"Throughput: {results['throughput_qps']:,.0f} queries/s "
+          f"(batch predict_many: {results['batch']['queries_per_sec']:,.0f} queries/s)")
+    mem = results['memory']
+    print(f"Model memory: {mem['heap_bytes'] / 1024:.0f} KB heap, {mem['disk_bytes'] / 1024:.0f} KB on disk")
+
+    print(f"\n{'stage':<12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage in STAGES:
+        s = results['latency'][stage]
+        line = f"{stage:<12}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}{s['p99_ms']:>10.3f}"
+        if baseline and stage in baseline.get('latency', {}):
+            b = baseline['latency'][stage]
+            line += f"   (p50 {s['p50_ms'] - b['p50_ms']:+.3f}, p99 {s['p99_ms'] - b['p99_ms']:+.3f})"
+        print(line)
+
+    acc = results['accuracy']
+    print(f"\nAccuracy at threshold {acc['threshold']}: {acc['overall_accuracy']:.4f}, "
+          f"fallback rate {acc['overall_fallback_rate']:.4f}")
+    if baseline:
+        b = baseline['accuracy']
+        print(f"  vs baseline: accuracy {acc['overall_accuracy'] - b['overall_accuracy']:+.4f}, "
+              f"fallback {acc['overall_fallback_rate'] - b['overall_fallback_rate']:+.4f}")
+    print(f"\n{'intent':<14}{'count':>7}{'accuracy':>10}{'fallback':>10}")
+    for intent, r in acc['per_intent'].items():
+        print(f"{intent:<14}{r['count']:>7}{r['accuracy']:>10.4f}{r['fallback_rate']:>10.4f}")
+    print("\nThreshold sweep:")
+    for r in acc['threshold_sweep']:
+        accepted = f"{r['accepted_accuracy']:.4f}" if r['accepted_accuracy'] is not None else "-"
+        print(f"  {r['threshold']:.2f}: fallback {r['fallback_rate']:.4f}, accepted accuracy {accepted}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--corpus', default=os.path.join('data', 'intent_training.csv'),
+                        help="CSV with 'query' and 'intent' columns")
+    parser.add_argument('--all', action='store_true', help='use the whole corpus instead of the held-out split')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--repeat', type=int, default=3, help='passes over the corpus for latency')
+    parser.add_argument('--cache', action='store_true', help='keep the prediction LRU cache enabled')
+    parser.add_argument('--output', default=None, help='JSON output path (default: data/bench/nlu_<rev>.json)')
+    parser.add_argument('--baseline', default=None, help='previous JSON result to compare against')
+    args = parser.parse_args()
+
+    queries, labels = load_corpus(args.corpus, holdout=not args.all)
+    model, memory = load_model(args.models_dir, cache_size=1024 if args.cache else 0)
+
+    # Warm up so one-off costs (lazy imports, first-call allocations) don't skew percentiles
+    for query in queries[:20]:
+        parse_query(query, model)
+
+    latency, throughput = bench_latency(model, queries, args.repeat)
+    revision = git_revision()
+    results = {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'corpus': {'path': args.corpus, 'holdout': not args.all, 'queries': len(queries), 'repeat': args.repeat},
+        'cache_enabled': args.cache,
+        'memory': memory,
+        'latency': latency,
+        'throughput_qps': throughput,
+        'batch': bench_batch(model, queries),
+        'accuracy': accuracy_report(model, queries, labels),
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join('data', 'bench', f"nlu_{revision or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Deterministic stand-in for the Ollama /api/generate endpoint.
+Answers are built from a fixed vocabulary seeded by the prompt, so the same
+prompt always gets the same reply, and timing is set by the command line:
+time to first token (optionally growing with prompt length) and a fixed delay
+per generated token. Useful for measuring the chat pipeline without a model.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.chatbot.llm_client import estimate_tokens
+
+VOCABULARY = (
+    "try to keep a consistent bedtime and wake time . your recovery looks steady ; "
+    "aim for light movement , hydrate well and avoid late caffeine . "
+    "a short walk after meals helps , and **sleep** is the biggest lever for hrv ."
+).split()
+
+
+class StandInSettings:
+    def __init__(self, ttft=0.2, token_delay=0.02, tokens=60, prompt_tokens_per_sec=0.0):
+        # Seconds before the first token
+        self.ttft = ttft
+        # Seconds between generated tokens
+        self.token_delay = token_delay
+        # Reply length when the request doesn't set a smaller num_predict
+        self.tokens = tokens
+        # When set, the time to first token grows by prompt_tokens / this rate
+        self.prompt_tokens_per_sec = prompt_tokens_per_sec
+
+
+def reply_tokens(prompt, count):
+    """The same prompt always yields the same words."""
+    seed = int.from_bytes(hashlib.blake2b(prompt.encode('utf-8'), digest_size=8).digest(), 'big')
+    rng = random.Random(seed)
+    return [rng.choice(VOCABULARY) + ' ' for _ in range(count)]
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections is normal here
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_handler(settings):
+    class StandInHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def _send_json(self, obj, status=200):
+            body = json.dumps(obj).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _write_chunk(self, obj):
+            line = (json.dumps(obj) + '\n').encode('utf-8')
+            self.wfile.write(f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n")
+            self.wfile.flush()
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self._send_json({'models': [{'name': 'stand-in'}]})
+            else:
+                self._send_json({'error': 'not found'}, 404)
+
+        def do_POST(self):
+            if self.path != '/api/generate':
+                self._send_json({'error': 'not found'}, 404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            prompt = request.get('prompt', '')
+            model = request.get('model', 'stand-in')
+            if not prompt:
+                # An empty prompt only loads the model
+                self._send_json({'model': model, 'response': '', 'done': True})
+                return
+
+            prompt_tokens = estimate_tokens(request.get('system', '') + prompt)
+            prompt_eval_s = prompt_tokens / settings.prompt_tokens_per_sec if settings.prompt_tokens_per_sec else 0.0
+            count = min(settings.tokens, request.get('options', {}).get('num_predict') or settings.tokens)
+            tokens = reply_tokens(prompt, count)
+            final = {
+                'model': model,
+                'response': '',
+                'done': True,
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prompt_eval_s * 1e9),
+                'eval_count': count,
+                'eval_duration': int(count * settings.token_delay * 1e9),
+            }
+
+            time.sleep(settings.ttft + prompt_eval_s)
+            if not request.get('stream', True):
+                time.sleep(count * settings.token_delay)
+                final['response'] = ''.join(tokens).strip()
+                self._send_json(final)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for i, token in enumerate(tokens):
+                    if i:
+                        time.sleep(settings.token_delay)
+                    self._write_chunk({'model': model, 'response': token, 'done': False})
+                self._write_chunk(final)
+                self.wfile.write(b"0\r\n\r\n")
+            except ConnectionError:
+                # Client cancelled mid-stream
+                pass
+
+    return StandInHandler
+
+
+def start_server(host='127.0.0.1', port=0, settings=None):
+    """Start the stand-in in a daemon thread; returns (server, base_url)."""
+    server = StandInServer((host, port), make_handler(settings or StandInSettings()))
+    thread = threading.Thread(target=server.serve_forever, name='ollama-stand-in', daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11435)
+    parser.add_argument('--ttft', type=float, default=0.2, help='seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between tokens')
+    parser.add_argument('--tokens', type=int, default=60, help='tokens per reply (capped by num_predict)')
+    parser.add_argument('--prompt-rate', type=float, default=0.0,
+                        help='prompt tokens evaluated per second; adds prompt length to the first-token delay')
+    args = parser.parse_args()
+
+    settings = StandInSettings(args.ttft, args.token_delay, args.tokens, args.prompt_rate)
+    server = StandInServer((args.host, args.port), make_handler(settings))
+    print(f"Ollama stand-in listening on http://{args.host}:{args.port} "
+          f"(ttft {args.ttft}s, {args.token_delay}s/token, {args.tokens} tokens)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
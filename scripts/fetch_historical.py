@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import argparse
+import logging
 
 from src.data.fetcher import fetch_recent_days
 
@@ -8,6 +9,7 @@ def main():
     parser.add_argument('--days', type=int, default=90)
     parser.add_argument('--force', action='store_true')
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
     success, total = fetch_recent_days(args.days, force=args.force)
     print(f"Fetched {success}/{total} days successfully.")
 
@@ -2,12 +2,26 @@
 """
 Generate synthetic training data for intent classification using templates.
 Output: data/intent_training.csv
+
+Every template defines a space of queries (metric synonym x time range x
+compare pair). Each intent's sample budget is split evenly across its templates
+(stratified), indices are sampled deterministically from each template's space,
+and duplicates are dropped by hash. Shards are expanded across a process pool
+and rows are streamed to disk as they arrive; the only per-row state kept is
+the 8-byte hash used for deduplication. Shards are taken from every template
+in turn and each window of rows is shuffled with the seed before it is
+written, so the file is mixed across intents (the online model is
+bootstrapped by streaming it in order) and identical for a given seed.
 """
 
+import argparse
 import csv
+import hashlib
 import os
 import random
 import sys
+import time
+from multiprocessing import Pool
 
 # Add project root to path to import templates
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
@@ -21,60 +35,168 @@ from src.chatbot.templates import (
 
 INTENTS = list(TEMPLATES.keys())
 
-
-def generate_queries_for_intent(intent, num_samples=150):
-    queries = []
-    templates = TEMPLATES[intent]
-
-    for _ in range(num_samples):
-        template = random.choice(templates)
-
-        # For advice templates that might have {metric} placeholder
-        if '{metric}' in template:
-            metric_key = random.choice(list(METRIC_SYNONYMS.keys()))
-            metric_phrase = random.choice(METRIC_SYNONYMS[metric_key])
-            template = template.replace('{metric}', metric_phrase)
-
-        if '{time_range}' in template:
-            time_range = random.choice(TIME_RANGES)
-            template = template.replace('{time_range}', time_range)
-
-        if '{time1}' in template and '{time2}' in template:
-            time1, time2 = random.choice(COMPARE_PAIRS)
-            template = template.replace('{time1}', time1).replace('{time2}', time2)
-
-        queries.append(template)
-
-    return queries
-
-
-def main():
-    random.seed(42)  # for reproducibility
-    num_per_intent = 1250  # increase to get more variety
-
-    all_queries = []
+# Flattened slot values, in a fixed order so indices are stable between runs
+METRIC_PHRASES = [phrase for synonyms in METRIC_SYNONYMS.values() for phrase in synonyms]
+SHARD_SIZE = 5000
+# Rows shuffled together before being written
+SHUFFLE_WINDOW = 100_000
+
+
+def template_slots(template):
+    """Return the list of value lists to substitute into a template."""
+    slots = []
+    if '{metric}' in template:
+        slots.append(('metric', METRIC_PHRASES))
+    if '{time_range}' in template:
+        slots.append(('time_range', TIME_RANGES))
+    if '{time1}' in template and '{time2}' in template:
+        slots.append(('compare', COMPARE_PAIRS))
+    return slots
+
+
+def space_size(template):
+    size = 1
+    for _, values in template_slots(template):
+        size *= len(values)
+    return size
+
+
+def render(template, index):
+    """Decode a mixed-radix index into one filled-in query for the template."""
+    query = template
+    for name, values in template_slots(template):
+        index, digit = divmod(index, len(values))
+        value = values[digit]
+        if name == 'metric':
+            query = query.replace('{metric}', value)
+        elif name == 'time_range':
+            query = query.replace('{time_range}', value)
+        else:
+            time1, time2 = value
+            query = query.replace('{time1}', time1).replace('{time2}', time2)
+    return query
+
+
+def allocate_quotas(sizes, total):
+    """
+    Split `total` samples across templates as evenly as possible, never giving a
+    template more than its space holds; leftover budget goes to larger templates.
+    """
+    quotas = [0] * len(sizes)
+    remaining = total
+    open_idx = [i for i, s in enumerate(sizes) if s > 0]
+    while remaining > 0 and open_idx:
+        share, extra = divmod(remaining, len(open_idx))
+        next_open = []
+        for rank, i in enumerate(open_idx):
+            want = share + (1 if rank < extra else 0)
+            take = min(want, sizes[i] - quotas[i])
+            quotas[i] += take
+            remaining -= take
+            if quotas[i] < sizes[i]:
+                next_open.append(i)
+        open_idx = next_open
+    return quotas
+
+
+def plan_shards(num_per_intent, seed, exhaustive=False):
+    """
+    Yield (intent, template, indices) shards covering the whole sample plan,
+    one shard from each template in turn so consecutive shards mix intents.
+    """
+    streams = []
     for intent in INTENTS:
-        queries = generate_queries_for_intent(intent, num_per_intent)
-        for q in queries:
-            all_queries.append((q, intent))
-
-    # Shuffle
-    random.shuffle(all_queries)
+        templates = TEMPLATES[intent]
+        sizes = [space_size(t) for t in templates]
+        quotas = sizes if exhaustive else allocate_quotas(sizes, num_per_intent)
+        for t_idx, (template, size, quota) in enumerate(zip(templates, sizes, quotas)):
+            if quota == 0:
+                continue
+            if quota >= size:
+                indices = range(size)
+            else:
+                rng = random.Random(f"{seed}:{intent}:{t_idx}")
+                indices = sorted(rng.sample(range(size), quota))
+            streams.append(iter([(intent, template, indices[start:start + SHARD_SIZE])
+                                 for start in range(0, len(indices), SHARD_SIZE)]))
+    while streams:
+        remaining = []
+        for stream in streams:
+            shard = next(stream, None)
+            if shard is not None:
+                yield shard
+                remaining.append(stream)
+        streams = remaining
+
+
+def expand_shard(shard):
+    """Worker: render one shard into (query, intent) rows."""
+    intent, template, indices = shard
+    return [(render(template, i), intent) for i in indices]
+
+
+def query_hash(query):
+    return hashlib.blake2b(query.lower().encode('utf-8'), digest_size=8).digest()
 
-    # Ensure output directory exists
-    os.makedirs('data', exist_ok=True)
 
-    # Write CSV
-    with open('data/intent_training.csv', 'w', newline='', encoding='utf-8') as f:
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--per-intent', type=int, default=1250, help='target examples per intent')
+    parser.add_argument('--exhaustive', action='store_true', help='enumerate every template combination')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default=os.path.join('data', 'intent_training.csv'))
+    parser.add_argument('--shuffle-window', type=int, default=SHUFFLE_WINDOW,
+                        help='rows buffered and shuffled together before writing')
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+
+    start = time.perf_counter()
+    seen = set()
+    written = 0
+    duplicates = 0
+    per_intent = {intent: 0 for intent in INTENTS}
+    sample = []
+
+    shards = plan_shards(args.per_intent, args.seed, args.exhaustive)
+    shuffle_rng = random.Random(f"{args.seed}:shuffle")
+    window = []
+    with open(args.output, 'w', newline='', encoding='utf-8') as f, Pool(args.workers) as pool:
         writer = csv.writer(f)
         writer.writerow(['query', 'intent'])
-        writer.writerows(all_queries)
 
-    print(f"Generated {len(all_queries)} training examples.")
+        def flush():
+            shuffle_rng.shuffle(window)
+            writer.writerows(window)
+            window.clear()
+
+        # imap keeps shard order, so output is identical for a given seed
+        for rows in pool.imap(expand_shard, shards):
+            for query, intent in rows:
+                h = query_hash(query)
+                if h in seen:
+                    duplicates += 1
+                    continue
+                seen.add(h)
+                window.append((query, intent))
+                per_intent[intent] += 1
+                written += 1
+                if len(sample) < 10 and written % 997 == 1:
+                    sample.append((query, intent))
+            if len(window) >= args.shuffle_window:
+                flush()
+        flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"Generated {written} training examples ({duplicates} duplicates dropped) "
+          f"in {elapsed:.2f}s ({written / elapsed:,.0f} rows/s).")
+    for intent, count in per_intent.items():
+        print(f"  {intent}: {count}")
     print("Sample:")
-    for q, i in all_queries[:10]:
+    for q, i in sample:
         print(f"  [{i}] {q}")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python
+"""
+End-to-end load test for the chat pipeline.
+Drives N concurrent simulated chat sessions through the same steps as
+cli_chat (intent classifier, entity extraction, router, SQLite store, LLM)
+against the deterministic Ollama stand-in, then reports throughput and
+per-path p50/p99 latency (data answers, advice, @ai). By default the store is
+a temporary database filled with synthetic days so runs are reproducible.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from scripts.benchmark_nlu import git_revision
+from scripts.fake_ollama_server import StandInSettings, start_server
+from src.chatbot import cli_chat
+from src.chatbot.cli_chat import LLM_STATIC_CONTEXT, ask_ai, generate_advice_with_ai, route_query
+from src.chatbot.llm_client import ERROR_PREFIX, OllamaClient, StreamError
+from src.chatbot.response_generator import generate_response
+from src.chatbot.router import NeighbourRouter
+from src.data import cache
+from src.data.history_store import SessionHistory
+from src.perf import spans
+from src.perf.stats import summarize
+
+PATHS = ['data', 'advice', 'ai']
+
+# Used when the training corpus isn't available
+FALLBACK_QUERIES = {
+    'get_current': ["What is my recovery today?", "How many steps did I take today?", "What's my hrv today?"],
+    'get_history': ["Show my sleep score for the last 7 days", "What was my rhr last week?"],
+    'compare': ["Compare my steps this week vs last week", "Was my sleep better today or yesterday?"],
+    'advice': ["How can I improve my sleep?", "What should I do to raise my hrv?"],
+}
+
+
+def seed_store(days, seed):
+    """Point the store at a temporary database filled with synthetic daily metrics."""
+    cache.DB_PATH = os.path.join(tempfile.mkdtemp(prefix='chat_load_'), 'ultrahuman.db')
+    cache.init_db()
+    rng = random.Random(seed)
+    today = date.today()
+    for offset in range(days, -1, -1):
+        cache.insert_metrics(today - timedelta(days=offset), {
+            'recovery_score': rng.uniform(55, 95),
+            'movement_score': rng.uniform(40, 90),
+            'sleep_score': rng.uniform(50, 95),
+            'total_sleep_min': rng.uniform(330, 520),
+            'sleep_efficiency': rng.uniform(80, 97),
+            'deep_sleep_min': rng.uniform(50, 120),
+            'rem_sleep_min': rng.uniform(60, 130),
+            'light_sleep_min': rng.uniform(180, 280),
+            'avg_temperature': rng.uniform(35.8, 36.8),
+            'total_steps': rng.randint(3000, 16000),
+            'hrv_avg': rng.uniform(35, 80),
+            'rhr_avg': rng.uniform(48, 66),
+            'active_minutes': rng.uniform(10, 120),
+            'vo2_max': rng.uniform(38, 50),
+        })
+
+
+def load_queries(path):
+    """Queries by intent from the training corpus (irrelevant ones excluded)."""
+    if not os.path.exists(path):
+        return FALLBACK_QUERIES
+    by_intent = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if row['intent'] != 'irrelevant':
+                by_intent.setdefault(row['intent'], []).append(row['query'])
+    return by_intent
+
+
+def session_script(queries, turns, ai_share, rng):
+    """A reproducible list of user turns; '@ai ' turns take the free-form LLM path."""
+    intents = sorted(queries)
+    script = []
+    for _ in range(turns):
+        intent = rng.choice(intents)
+        query = rng.choice(queries[intent])
+        if rng.random() < ai_share:
+            query = '@ai ' + query
+        script.append(query)
+    return script
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = {path: [] for path in PATHS}
+        self.ttft = {path: [] for path in PATHS}
+        self.errors = 0
+
+    def add(self, path, seconds, ttft=None, error=False):
+        with self.lock:
+            self.latency[path].append(seconds)
+            if ttft is not None:
+                self.ttft[path].append(ttft)
+            if error:
+                self.errors += 1
+
+
+def consume(chunks, start):
+    """Drain a chunk stream; returns (text, seconds to first chunk). A failed stream returns its error line."""
+    text = ""
+    first = None
+    for chunk in chunks:
+        if first is None:
+            first = time.perf_counter() - start
+        if isinstance(chunk, StreamError):
+            return str(chunk), first
+        text += chunk
+    return text.strip(), first
+
+
+def run_session(script, intent_model, router, router_lock, base_url, recorder):
+    """One simulated user: same decisions as cli_chat.main, with its own client and history."""
+    llm_client = OllamaClient(base_url=base_url, static_context=LLM_STATIC_CONTEXT)
+    history = SessionHistory('load-test')
+    for query in script:
+        start = time.perf_counter()
+        ttft = None
+        if query.startswith('@ai '):
+            path = 'ai'
+            response, ttft = consume(ask_ai(query[4:], llm_client, stream=True, history=history), start)
+        else:
+            # NeighbourRouter isn't thread-safe; cli_chat only ever has one session
+            with router_lock:
+                parsed, intent, similarity = route_query(query, intent_model, router)
+            if intent is not None and intent != 'advice':
+                path = 'data'
+                response = generate_response(intent, parsed.metric, parsed.time_info)
+                if not similarity:
+                    with router_lock:
+                        router.add(query, intent)
+            else:
+                path = 'advice'
+                response, ttft = consume(generate_advice_with_ai(
+                    query, parsed.metric, parsed.time_info, llm_client, stream=True, history=history), start)
+        recorder.add(path, time.perf_counter() - start, ttft, error=response.startswith(ERROR_PREFIX))
+        history.add_turn(query, response)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=8, help='concurrent chat sessions')
+    parser.add_argument('--turns', type=int, default=20, help='turns per session')
+    parser.add_argument('--ai-share', type=float, default=0.2, help="fraction of turns sent with '@ai'")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--corpus', default=os.path.join('data', 'intent_training.csv'))
+    parser.add_argument('--ollama-url', default=None,
+                        help='use a running server (real or stand-in) instead of starting a stand-in')
+    parser.add_argument('--ttft', type=float, default=0.2, help='stand-in seconds before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='stand-in seconds between tokens')
+    parser.add_argument('--tokens', type=int, default=60, help='stand-in tokens per reply')
+    parser.add_argument('--use-db', action='store_true', help='query the real database instead of synthetic data')
+    parser.add_argument('--days', type=int, default=60, help='synthetic days to store')
+    parser.add_argument('--llm-cache', action='store_true', help='keep the persistent LLM answer cache enabled')
+    parser.add_argument('--output', default=None, help='JSON output path (default: data/bench/chat_<rev>.json)')
+    args = parser.parse_args()
+
+    if not args.use_db:
+        seed_store(args.days, args.seed)
+    # Cached answers would hide the LLM path being measured
+    cli_chat.llm_cache.enabled = args.llm_cache
+
+    base_url = args.ollama_url
+    if base_url is None:
+        _, base_url = start_server(settings=StandInSettings(args.ttft, args.token_delay, args.tokens))
+
+    intent_model = cli_chat.load_classifier()
+    router = NeighbourRouter.from_corpus(args.corpus)
+    router_lock = threading.Lock()
+    queries = load_queries(args.corpus)
+    rng = random.Random(args.seed)
+    scripts = [session_script(queries, args.turns, args.ai_share, rng) for _ in range(args.sessions)]
+
+    recorder = Recorder()
+    threads = [threading.Thread(target=run_session,
+                                args=(script, intent_model, router, router_lock, base_url, recorder))
+               for script in scripts]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    turns = sum(len(times) for times in recorder.latency.values())
+    revision = git_revision()
+    results = {
+        'revision': revision,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        'elapsed_s': elapsed,
+        'turns': turns,
+        'throughput_tps': turns / elapsed,
+        'errors': recorder.errors,
+        'paths': {path: {'latency': summarize(recorder.latency[path]),
+                         'ttft': summarize(recorder.ttft[path])} for path in PATHS},
+        'router': router.stats(),
+        # Per-stage timings from the span recorder (NLU, SQLite, LLM)
+        'stages': spans.recorder.stats(),
+    }
+
+    print(f"\n{args.sessions} sessions x {args.turns} turns in {elapsed:.2f}s: "
+          f"{results['throughput_tps']:.1f} turns/s, {recorder.errors} errors")
+    print(f"\n{'path':<8}{'turns':>7}{'p50 ms':>10}{'p99 ms':>10}{'ttft p50':>10}{'ttft p99':>10}")
+    for path in PATHS:
+        lat, ttft = results['paths'][path]['latency'], results['paths'][path]['ttft']
+        ttft_cols = f"{ttft['p50_ms']:>10.1f}{ttft['p99_ms']:>10.1f}" if ttft['count'] else f"{'-':>10}{'-':>10}"
+        print(f"{path:<8}{lat['count']:>7}{lat['p50_ms']:>10.1f}{lat['p99_ms']:>10.1f}{ttft_cols}")
+
+    output = args.output or os.path.join('data', 'bench', f"chat_{revision or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+"""
+Incrementally update the online intent model (HashingVectorizer + SGD).
+Bootstraps from the synthetic training CSV (several shuffled passes) if no model
+exists yet, then folds in labeled entries from the chat query log in
+mini-batches. Log entries applied before are remembered in the model and
+skipped. The model is only saved if its accuracy on a held-out slice of the
+training CSV reaches MIN_ACCURACY; the chat uses it only then.
+Saves to models/online_intent_model.pkl.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.chatbot.online_model import (
+    MIN_ACCURACY,
+    ONLINE_MODEL_PATH,
+    QUERY_LOG_PATH,
+    OnlineIntentModel,
+    is_holdout,
+    iter_batches,
+    read_labeled_log,
+    read_training_csv,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default=ONLINE_MODEL_PATH)
+    parser.add_argument('--log', default=QUERY_LOG_PATH, help='JSONL query log with a "label" field per entry')
+    parser.add_argument('--bootstrap', default=os.path.join('data', 'intent_training.csv'),
+                        help='CSV used to initialise the model when it does not exist yet, and for the held-out check')
+    parser.add_argument('--bootstrap-epochs', type=int, default=5, help='shuffled passes over the bootstrap CSV')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--epochs', type=int, default=1, help='passes over the newly labeled log entries')
+    parser.add_argument('--min-accuracy', type=float, default=MIN_ACCURACY,
+                        help='held-out accuracy required before the model is saved')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.bootstrap):
+        print(f"{args.bootstrap} not found; it is needed for the held-out check. "
+              f"Run scripts/generate_training_data.py first.")
+        sys.exit(1)
+    examples = list(read_training_csv(args.bootstrap))
+    holdout = [example for example in examples if is_holdout(example[0])]
+
+    if os.path.exists(args.model):
+        model = OnlineIntentModel.load(args.model)
+        print(f"Loaded online model ({model.n_seen} examples seen so far).")
+    else:
+        model = OnlineIntentModel()
+        start = time.perf_counter()
+        train = [example for example in examples if not is_holdout(example[0])]
+        count = model.fit_epochs(train, epochs=args.bootstrap_epochs, batch_size=1024)
+        print(f"Bootstrapped new model from {count} examples x {args.bootstrap_epochs} epochs "
+              f"in {time.perf_counter() - start:.2f}s.")
+
+    new_entries = [(key, query, label) for key, query, label in read_labeled_log(args.log, model.classes)
+                   if key not in model.applied_log]
+    total = 0
+    batches = 0
+    start = time.perf_counter()
+    for _ in range(args.epochs):
+        for queries, intents in iter_batches(((query, label) for _, query, label in new_entries), args.batch_size):
+            model.partial_fit(queries, intents)
+            total += len(queries)
+            batches += 1
+    elapsed = time.perf_counter() - start
+    model.applied_log.update(key for key, _, _ in new_entries)
+
+    if batches:
+        print(f"Applied {len(new_entries)} new labeled queries ({total} updates) in {batches} batches "
+              f"({elapsed * 1000 / batches:.1f} ms/batch).")
+    else:
+        print(f"No new labeled queries in {args.log}.")
+
+    accuracy = model.accuracy(holdout)
+    print(f"Held-out accuracy: {accuracy:.1%} on {len(holdout)} examples.")
+    if accuracy < args.min_accuracy:
+        print(f"Below {args.min_accuracy:.0%}; model not saved.")
+        sys.exit(1)
+    model.holdout_accuracy = accuracy
+    model.save(args.model)
+    print(f"Model saved to {args.model}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ import json
 from datetime import date
 from typing import Any, Dict, Optional
 
-import requests
+from src.perf.spans import timed
 
 
 def get_config():
@@ -35,6 +35,7 @@ def get_email():
     return email
 
 
+@timed('api.fetch')
 def fetch_daily_metrics(
         query_date: date,
         token: Optional[str] = None,
@@ -68,6 +69,8 @@ def fetch_daily_metrics(
         if email_from_config:
             params["email"] = email_from_config
 
+    # Imported on first fetch to keep startup fast
+    import requests
     response = requests.get(url, headers=headers, params=params)
 
     if response.status_code != 200:
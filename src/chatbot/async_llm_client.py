@@ -0,0 +1,250 @@
+"""
+Asyncio client for Ollama that many chat sessions can share.
+Requests go through a bounded priority queue served by a fixed number of
+workers, so interactive turns are sent before background work (summaries,
+reports) and the local model server never sees more than `concurrency`
+requests at once. Every call has a timeout and can be cancelled by the caller.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot.llm_client import ERROR_PREFIX, PromptBuilder, StreamError, call_stats, make_payload
+
+logger = logging.getLogger(__name__)
+
+# Lower values are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+_DONE = object()
+
+
+class QueueFullError(Exception):
+    """Raised when the request queue is at capacity."""
+
+
+class _Job:
+    def __init__(self, payload, timeout):
+        self.payload = payload
+        self.timeout = timeout
+        # The timeout runs from enqueue, so time spent waiting in the queue counts against it
+        self.deadline = asyncio.get_running_loop().time() + timeout
+        # Response chunks flow back to the caller through this queue; _DONE or an exception ends it
+        self.chunks = asyncio.Queue()
+        self.stats = {}
+        self.cancelled = False
+        # The worker's request task while it runs, so the caller can abort it
+        self.task = None
+
+    def remaining(self):
+        return self.deadline - asyncio.get_running_loop().time()
+
+    def cancel(self):
+        """Drop the job: skipped if still queued, aborted (closing its connection) if running."""
+        self.cancelled = True
+        if self.task is not None:
+            self.task.cancel()
+
+
+async def _read_body_lines(reader, headers):
+    """Yield the NDJSON lines of an HTTP/1.1 response body (chunked or Content-Length)."""
+    buffer = b""
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+            if size == 0:
+                break
+            buffer += await reader.readexactly(size)
+            await reader.readexactly(2)
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                yield line
+    elif 'content-length' in headers:
+        buffer = await reader.readexactly(int(headers['content-length']))
+    else:
+        buffer = await reader.read()
+    for line in buffer.split(b"\n"):
+        yield line
+
+
+class AsyncOllamaClient:
+    def __init__(self, model="llama3.2:latest", base_url="http://localhost:11434", keep_alive="30m",
+                 concurrency=2, max_queue=32, timeout=120.0, connect_timeout=5.0):
+        self.model = model
+        self.base_url = base_url
+        self.keep_alive = keep_alive
+        # Requests in flight against the server at once
+        self.concurrency = concurrency
+        # Waiting requests beyond this are rejected with QueueFullError
+        self.max_queue = max_queue
+        # Default limit in seconds for a whole call, from enqueue to the last token
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.last_stats = {}
+        url = urlsplit(base_url)
+        self._host = url.hostname
+        self._port = url.port or 80
+        self._queue = None
+        self._workers = []
+        self._seq = itertools.count()
+
+    async def start(self):
+        """Start the worker tasks; called automatically on first use."""
+        if self._queue is not None:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker(), name=f"ollama-worker-{i}")
+                         for i in range(self.concurrency)]
+
+    async def close(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queue = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def queue_size(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def generate_stream(self, query, prompt_builder=None, history=None, context=None,
+                              max_tokens=300, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """
+        Yield response text chunks. Each session should pass its own PromptBuilder
+        so history windows don't interfere. Closing or cancelling the consumer
+        aborts the request and frees its worker at once; a timeout (counted from
+        enqueue) yields an error line like OllamaClient does.
+        """
+        await self.start()
+        builder = prompt_builder or PromptBuilder()
+        payload = make_payload(self.model, builder.build(query, history, context),
+                               self.keep_alive, max_tokens, stream=True)
+        job = _Job(payload, timeout or self.timeout)
+        try:
+            self._queue.put_nowait((priority, next(self._seq), job))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"LLM request queue is full ({self.max_queue} waiting)")
+        try:
+            while True:
+                try:
+                    item = await asyncio.wait_for(job.chunks.get(), max(job.remaining(), 0))
+                except asyncio.TimeoutError:
+                    item = TimeoutError(f"timed out after {job.timeout:g}s")
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    yield StreamError(f"{ERROR_PREFIX}: {item}")
+                    break
+                yield item
+            self.last_stats = job.stats
+        finally:
+            # Drop the job if it hasn't finished, so it doesn't hold a worker
+            job.cancel()
+
+    async def generate(self, query, prompt_builder=None, history=None, context=None,
+                       max_tokens=300, priority=PRIORITY_INTERACTIVE, timeout=None):
+        """Collect a complete response; on failure, the error line alone (like OllamaClient.generate)."""
+        text = ""
+        async for chunk in self.generate_stream(query, prompt_builder, history, context,
+                                                max_tokens, priority, timeout):
+            if isinstance(chunk, StreamError):
+                return str(chunk)
+            text += chunk
+        return text.strip()
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                if not job.cancelled:
+                    await self._serve(job)
+            finally:
+                self._queue.task_done()
+
+    async def _serve(self, job):
+        """Run one job until it finishes, times out or its caller cancels it."""
+        if job.remaining() <= 0:
+            job.chunks.put_nowait(TimeoutError(f"timed out after {job.timeout:g}s"))
+            return
+        job.task = asyncio.create_task(self._run(job))
+        try:
+            # asyncio.wait neither raises when the caller cancels the task nor cancels it on timeout
+            done, _ = await asyncio.wait({job.task}, timeout=job.remaining())
+        except asyncio.CancelledError:
+            # The client is closing: the answer is incomplete, so the caller gets an error, not _DONE
+            job.task.cancel()
+            job.chunks.put_nowait(ConnectionError("client closed"))
+            raise
+        if not done:
+            job.task.cancel()
+            # Wait for the connection to close before taking the next job
+            await asyncio.wait({job.task})
+            job.chunks.put_nowait(TimeoutError(f"timed out after {job.timeout:g}s"))
+        elif job.task.cancelled():
+            # The caller went away; nobody reads the chunks
+            return
+        elif job.task.exception() is not None:
+            job.chunks.put_nowait(job.task.exception())
+        else:
+            job.chunks.put_nowait(_DONE)
+
+    async def _run(self, job):
+        """POST the payload and forward streamed chunks until done or the caller goes away."""
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self._host, self._port), self.connect_timeout)
+        try:
+            body = json.dumps(job.payload).encode('utf-8')
+            writer.write(
+                f"POST /api/generate HTTP/1.1\r\nHost: {self._host}:{self._port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: close\r\n\r\n".encode('ascii') + body
+            )
+            await writer.drain()
+
+            status = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin-1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            if len(status) < 2 or not status[1].startswith('2'):
+                raise RuntimeError(f"HTTP {' '.join(status[1:]) or 'error'}")
+
+            first_token_at = None
+            chunks = 0
+            async for line in _read_body_lines(reader, headers):
+                if job.cancelled:
+                    # Closing the connection makes Ollama stop generating
+                    return
+                if not line.strip():
+                    continue
+                data = json.loads(line)
+                text = data.get("response", "")
+                if text:
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks += 1
+                    job.chunks.put_nowait(text)
+                if data.get("done"):
+                    job.stats = call_stats(start, first_token_at, data, chunks)
+                    return
+            raise ConnectionError("response ended before it was done")
+        finally:
+            writer.close()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+"""
+Batch mode: answer queries from a JSONL file (or stdin) without the REPL.
+Each input line is a JSON object with a "query" (and optionally an "id"), or
+a bare JSON string. Queries go through the same routing, entity extraction,
+generate_response and optional LLM path as the chat, spread over a process
+pool whose workers load the models once. Results are written as JSONL in
+input order with intent, entities, answer and timings.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot import cli_chat
+from src.chatbot.entity_extractor import resolve_time_range
+from src.chatbot.response_generator import generate_response
+from src.data.cache import init_db
+from src.data.history_store import SessionHistory
+
+# Per-process state set up once by init_worker
+_worker = {}
+
+
+def init_worker(use_llm=False, ollama_url="http://localhost:11434", model="llama3.2:latest", llm_cache=True):
+    """Load the classifier, router and (optionally) LLM client for this process."""
+    intent_model, router = cli_chat.load_models()
+    llm_client = None
+    if use_llm:
+        llm_client = cli_chat.OllamaClient(model=model, base_url=ollama_url,
+                                           static_context=cli_chat.LLM_STATIC_CONTEXT)
+    cli_chat.llm_cache.enabled = llm_cache
+    _worker.update(intent_model=intent_model, router=router, llm_client=llm_client)
+
+
+def read_queries(lines):
+    """Yield (line number, record) for each non-blank JSONL line; bad lines become error records."""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {'error': f"invalid JSON: {e}"}
+        if isinstance(record, str):
+            record = {'query': record}
+        yield number, record
+
+
+def answer(item, today=None):
+    """Answer one (line number, record) pair; runs in a worker process."""
+    number, record = item
+    result = {'id': record.get('id', number), 'query': record.get('query')}
+    query = record.get('query')
+    if not isinstance(query, str) or not query.strip():
+        result['error'] = record.get('error', 'missing "query"')
+        return result
+
+    intent_model, router, llm_client = _worker['intent_model'], _worker['router'], _worker['llm_client']
+    start = time.perf_counter()
+    try:
+        if query.lower().startswith('@ai'):
+            result.update(path='ai', intent=None)
+            parsed = None
+        else:
+            parsed, intent, similarity = cli_chat.route_query(query, intent_model, router, today)
+            result.update(intent=intent, confidence=parsed.confidence, routed=bool(similarity),
+                          metric=parsed.metric, time_range=parsed.time_info)
+            if parsed.time_info:
+                try:
+                    result['date_range'] = resolve_time_range(parsed.time_info, today or date.today())
+                except ValueError:
+                    pass
+            result['path'] = 'data' if intent is not None and intent != 'advice' else 'advice'
+        routed_at = time.perf_counter()
+
+        if result['path'] == 'data':
+            result['answer'] = generate_response(result['intent'], parsed.metric, parsed.time_info, today)
+        elif llm_client is None:
+            result['answer'] = None
+        else:
+            # Cleared so a cached answer doesn't report the previous call's timing
+            llm_client.last_stats = {}
+            # A fresh in-memory history: batch queries are independent and nothing is stored
+            history = SessionHistory('batch')
+            if result['path'] == 'ai':
+                result['answer'] = cli_chat.ask_ai(query[3:].strip(), llm_client, history=history)
+            else:
+                result['answer'] = cli_chat.generate_advice_with_ai(query, parsed.metric, parsed.time_info,
+                                                                    llm_client, history=history, today=today)
+        done_at = time.perf_counter()
+        if result['answer'] and result['answer'].startswith(cli_chat.ERROR_PREFIX):
+            result['error'] = result['answer']
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    timings = {}
+    if parsed is not None:
+        timings.update({f"nlu_{stage}_ms": seconds * 1000 for stage, seconds in parsed.timings.items()})
+        timings['route_ms'] = (routed_at - start) * 1000
+    timings['answer_ms'] = (done_at - routed_at) * 1000
+    timings['total_ms'] = (done_at - start) * 1000
+    if result['path'] != 'data' and llm_client is not None and llm_client.last_stats:
+        timings['llm_ttft_ms'] = llm_client.last_stats['ttft_s'] * 1000
+    result['timings'] = timings
+    return result
+
+
+def answer_chunk(items, today=None):
+    return [answer(item, today) for item in items]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def answer_all(items, workers=None, chunksize=16, today=None, worker_args=()):
+    """
+    Yield results in input order. Chunks are submitted as earlier ones finish,
+    so memory stays bounded however long the input is. workers=0 answers in
+    this process.
+    """
+    if workers == 0:
+        init_worker(*worker_args)
+        for chunk in chunked(items, chunksize):
+            yield from answer_chunk(chunk, today)
+        return
+    workers = workers or os.cpu_count() or 1
+    # Refresh the compact model and router index here once, so workers only read them
+    cli_chat.load_models()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=worker_args) as pool:
+        pending = deque()
+        for chunk in chunked(items, chunksize):
+            pending.append(pool.submit(answer_chunk, chunk, today))
+            # Enough queued work to keep every worker busy, no more
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def run_batch(lines, output, workers=None, chunksize=16, today=None, use_llm=False,
+              ollama_url="http://localhost:11434", model="llama3.2:latest", llm_cache=True):
+    """Answer every query in lines and write one JSON result per line. Returns (answered, errors, seconds)."""
+    init_db()
+    start = time.perf_counter()
+    answered = errors = 0
+    worker_args = (use_llm, ollama_url, model, llm_cache)
+    for result in answer_all(read_queries(lines), workers, chunksize, today, worker_args):
+        output.write(json.dumps(result, default=str) + '\n')
+        answered += 1
+        errors += 'error' in result
+    return answered, errors, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of queries without the chat loop")
+    parser.add_argument('input', help="JSONL file of queries, or '-' for stdin")
+    parser.add_argument('--output', '-o', default='-', help="JSONL results file, or '-' for stdout (default)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU; 0 answers in this process)')
+    parser.add_argument('--chunksize', type=int, default=16, help='queries handed to a worker at a time')
+    parser.add_argument('--today', type=date.fromisoformat, default=None,
+                        help='resolve relative dates against this YYYY-MM-DD, for reproducible replays')
+    parser.add_argument('--llm', action='store_true', help='answer advice and @ai queries with the LLM')
+    parser.add_argument('--no-llm-cache', action='store_true', help='skip the persistent LLM answer cache')
+    parser.add_argument('--ollama-url', default="http://localhost:11434")
+    parser.add_argument('--model', default="llama3.2:latest")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        answered, errors, seconds = run_batch(
+            source, output, args.workers, args.chunksize, args.today, use_llm=args.llm,
+            ollama_url=args.ollama_url, model=args.model, llm_cache=not args.no_llm_cache,
+        )
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    print(f"Answered {answered} queries ({errors} errors) in {seconds:.2f}s: "
+          f"{answered / seconds if seconds else 0:.1f} queries/s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,32 +4,49 @@ Terminal-based chat loop for AI Health Coach.
 Loads intent classifier, vectorizer, and handles user queries.
 """
 
+import atexit
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
-import joblib
 from rich.console import Console
-from rich.markdown import Markdown
 from rich.panel import Panel
 from rich.prompt import Prompt
 
 # Add project root to path
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
-from src.chatbot.entity_extractor import extract_metric, extract_time_range, resolve_time_range
-from src.chatbot.llm_client import OllamaClient
-from src.chatbot.response_generator import generate_response
-from src.data.cache import get_latest_metrics
+from src.chatbot.context_builder import build_metrics_context
+from src.chatbot.entity_extractor import extract_metric, resolve_time_range
+from src.chatbot.intent_classifier import IntentClassifier, normalize_query
+from src.chatbot.llm_client import ERROR_PREFIX, OllamaClient, StreamError
+from src.chatbot.nlu import parse_query
+from src.chatbot.online_model import ONLINE_MODEL_PATH, OnlineIntentModel, log_query
+from src.chatbot.response_generator import generate_response, response_cache
+from src.data.bootstrap import bootstrap
 from src.data.fetcher import fetch_recent_days
+from src.data.history_store import HistoryStore
+from src.data.llm_cache import LLMResponseCache, make_key
+from src.data.metrics import METRIC_DESCRIPTIONS
 from src.data.cache import fetch_metrics
+from src.perf.profiler import profiler
+from src.perf.spans import new_turn, recorder, span
 
-# Chat history
-chat_history = []
+# Chat history: the last MAX_HISTORY exchanges in memory, all of it persisted
 MAX_HISTORY = 50
+history_store = HistoryStore(max_messages=MAX_HISTORY * 2)
+chat_history = history_store.new_session()
 
 # Initialize rich console
 console = Console()
 
+# Persistent cache of LLM answers, keyed on query, model and data summary
+llm_cache = LLMResponseCache()
+
+# Seconds spent in each startup stage, for main.py --profile-startup
+startup_timings = {}
+
 
 def clear_screen():
     """Clear terminal screen."""
@@ -42,9 +59,16 @@ def print_help():
   @ai          - To ask AI anything
   /clear       - Clear the screen
   /new_chat    - Clear screen and reset conversation history
+  /sessions    - List recent chat sessions
+  /resume \[id] - Resume a previous session (default: the most recent)
   /update \[n]  - Fetch last n days of data (default: 7)
+  /sync        - Show progress of the first-run data sync
   /history     - Show recent chat history
   /metrics     - Show available metrics
+  /llm_cache \[on|off|clear] - Show, toggle or clear the AI answer cache
+  /stats \[reset] - Show latency per stage (p50/p95/p99) and cache hit rates
+  /trace \[file|off] - Write every timed stage to a JSON-lines file
+  /profile on \[n]|off|dump - Profile turns (or the next n) with cProfile and tracemalloc
   /help        - Show this help message
   /exit        - Exit the application (also 'quit' or 'exit')"""
     console.print(Panel(help_text, title="Help", border_style="cyan"))
@@ -54,76 +78,267 @@ def show_history():
         console.print("[yellow]No chat history yet.[/yellow]")
         return
     history_text = ""
-    for role, msg in chat_history[-10:]:  # show last 10 messages
+    for role, msg in chat_history.recent(10):  # show last 10 messages
         prefix = "[bold green]You:[/bold green]" if role == "user" else "[bold blue]Assistant:[/bold blue]"
         history_text += f"{prefix} {msg}\n"
     console.print(Panel(history_text, title="Recent Chat History", border_style="cyan"))
 
 
+# Same for every turn, so it sits in the stable part of the LLM prompt
+LLM_STATIC_CONTEXT = "The user's Ultrahuman ring metrics are: " + "; ".join(
+    f"{k} = {v}" for k, v in METRIC_DESCRIPTIONS.items()
+) + "."
+
+
 def show_metrics():
-    metrics_desc = {
-        'recovery_score': 'Recovery score (0-100) indicating how well you recovered',
-        'movement_score': 'Movement score based on activity',
-        'sleep_score': 'Overall sleep quality score',
-        'total_sleep_min': 'Total sleep time in minutes',
-        'sleep_efficiency': 'Sleep efficiency percentage',
-        'deep_sleep_min': 'Deep sleep minutes',
-        'rem_sleep_min': 'REM sleep minutes',
-        'light_sleep_min': 'Light sleep minutes',
-        'avg_temperature': 'Average skin temperature during sleep',
-        'total_steps': 'Daily step count',
-        'hrv_avg': 'Average heart rate variability',
-        'rhr_avg': 'Resting heart rate',
-        'active_minutes': 'Active minutes',
-        'vo2_max': 'VO2 max estimate',
-    }
-    text = "\n".join([f"[bold]{k}[/bold]: {v}" for k, v in metrics_desc.items()])
+    text = "\n".join([f"[bold]{k}[/bold]: {v}" for k, v in METRIC_DESCRIPTIONS.items()])
     console.print(Panel(text, title="Available Metrics", border_style="cyan"))
 
 
-def load_classifier():
-    """Load trained vectorizer and intent classifier."""
-    vectorizer_path = os.path.join('models', 'vectorizer.pkl')
-    classifier_path = os.path.join('models', 'intent_classifier.pkl')
+def show_stats(router=None):
+    from rich.table import Table
+    table = Table(title="Latency by stage (ms, recent window)")
+    table.add_column("stage")
+    for column in ("count", "p50", "p95", "p99", "max"):
+        table.add_column(column, justify="right")
+    for stage, s in recorder.stats().items():
+        table.add_row(stage, str(s['total']), f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}",
+                      f"{s['p99_ms']:.2f}", f"{s['max_ms']:.2f}")
+    if table.row_count:
+        console.print(table)
+    else:
+        console.print("[yellow]No timings recorded yet.[/yellow]")
+
+    answers = response_cache.stats()
+    llm = llm_cache.stats()
+    lines = [
+        f"Answer cache: {answers['size']} entries, hit rate {answers['hit_rate']:.0%} "
+        f"({answers['invalidations']} invalidated)",
+        f"LLM cache: {llm['size']} entries, hit rate {llm['hit_rate']:.0%}",
+    ]
+    if router is not None:
+        routed = router.stats()
+        lines.append(f"Router: {routed['routed']} routed, {routed['escalated']} escalated to the LLM")
+    if recorder.trace_path:
+        lines.append(f"Tracing to {recorder.trace_path}")
+    console.print("[dim]" + "\n".join(lines) + "[/dim]")
+
+
+def show_profile_reports(reports):
+    if reports:
+        console.print(f"[green]Profile written:[/green]\n  {reports[0]}\n  {reports[1]}")
+
+
+def profile_command(args):
+    action = args[0].lower() if args else 'status'
+    if action == 'on':
+        turns = None
+        if len(args) > 1:
+            try:
+                turns = int(args[1])
+            except ValueError:
+                console.print("[red]Usage: /profile on [n][/red]")
+                return
+        profiler.on(turns)
+        target = f"the next {turns} turns" if turns else "every turn until /profile off"
+        console.print(f"[green]Profiling {target}.[/green]")
+    elif action == 'off':
+        profiler.off()
+        console.print(f"[green]Profiling off ({profiler.turns} turns collected; /profile dump writes them).[/green]")
+    elif action == 'dump':
+        reports = profiler.dump()
+        if reports is None:
+            console.print("[yellow]Nothing profiled yet. Use /profile on first.[/yellow]")
+        show_profile_reports(reports)
+    else:
+        state = "on" if profiler.active else "off"
+        console.print(f"[green]Profiling {state}, {profiler.turns} turns collected.[/green]")
+
 
-    if not os.path.exists(vectorizer_path) or not os.path.exists(classifier_path):
+def show_sync():
+    status = bootstrap.status()
+    if not any(status.values()):
+        console.print("[green]No data sync has run this session.[/green]")
+        return
+    console.print(f"[green]Data sync: {status['loaded']} days loaded, {status['pending']} still syncing, "
+                  f"{status['failed']} failed.[/green]")
+    failed = bootstrap.failed()
+    if failed:
+        console.print(f"[yellow]Could not fetch {', '.join(str(day) for day in failed)}; "
+                      f"try /update to retry.[/yellow]")
+
+
+def check_model_files():
+    """Exit with a message unless some intent model has been trained."""
+    trained = (os.path.exists(os.path.join('models', 'vectorizer.pkl'))
+               and os.path.exists(os.path.join('models', 'intent_classifier.pkl')))
+    compact = os.path.exists(os.path.join('models', 'intent_compact.npz'))
+    if not (os.path.exists(ONLINE_MODEL_PATH) or trained or compact):
         console.print("[red]Error: Model files not found. Please run train_intent_classifier.py first.[/red]")
         sys.exit(1)
 
-    vectorizer = joblib.load(vectorizer_path)
-    classifier = joblib.load(classifier_path)
-    return vectorizer, classifier
-
 
-def predict_intent_with_confidence(vectorizer, classifier, query: str, threshold=0.5):
-    query_vec = vectorizer.transform([query])
-    proba = classifier.predict_proba(query_vec)[0]
-    max_prob = max(proba)
-    if max_prob < threshold:
-        return None, max_prob, None
-    intent = classifier.classes_[proba.argmax()]
-    return intent, max_prob, proba
+def load_classifier():
+    """Load the online intent model if one passed its held-out check, else the trained TF-IDF classifier."""
+    check_model_files()
+    if os.path.exists(ONLINE_MODEL_PATH):
+        online = OnlineIntentModel.load(ONLINE_MODEL_PATH)
+        if online.validated():
+            return online.as_intent_classifier()
+        console.print(f"[yellow]Ignoring {ONLINE_MODEL_PATH}: it has not passed the held-out check "
+                      f"(rerun scripts/update_intent_model.py).[/yellow]")
+    return IntentClassifier.load('models')
+
+
+def load_models():
+    """Load the intent classifier and the similarity router, recording how long each took."""
+    start = time.perf_counter()
+    intent_model = load_classifier()
+    startup_timings['classifier'] = time.perf_counter() - start
+
+    # Imported here: the router pulls in NumPy
+    from src.chatbot.router import NeighbourRouter
+    start = time.perf_counter()
+    router = NeighbourRouter.from_corpus(os.path.join('data', 'intent_training.csv'))
+    startup_timings['router'] = time.perf_counter() - start
+    return intent_model, router
+
+
+def show_sessions():
+    sessions = history_store.list_sessions()
+    if not sessions:
+        console.print("[yellow]No saved sessions yet.[/yellow]")
+        return
+    lines = []
+    for session_id, last_active, messages in sessions:
+        marker = " [green](current)[/green]" if session_id == chat_history.session_id else ""
+        when = datetime.fromtimestamp(last_active).strftime('%Y-%m-%d %H:%M')
+        lines.append(f"[bold]{session_id[:8]}[/bold]  {when}  {messages} messages{marker}")
+    console.print(Panel("\n".join(lines), title="Recent Sessions", border_style="cyan"))
+
+
+def resume_session(prefix=None):
+    """Return the stored session whose id starts with prefix (default: the latest other session)."""
+    for session_id, _, _ in history_store.list_sessions(limit=50):
+        if session_id == chat_history.session_id:
+            continue
+        if prefix is None or session_id.startswith(prefix):
+            return history_store.open(session_id)
+    return None
 
 
 def get_recent_history(history, n=5):
     """Return last n exchanges (each exchange = user+assistant)."""
-    max_entries = n * 2
-    return history[-max_entries:] if len(history) > max_entries else history
-
-
-def ask_ai(query, llm_client, max_tokens=300):
-    """Get AI response with latest metrics as context."""
-    latest = get_latest_metrics()
-    context = None
-    if latest:
-        context = f"Latest metrics: {dict(latest)}"
-    recent = get_recent_history(chat_history, n=5) if chat_history else None
-    return llm_client.generate(query, history=recent, context=context, max_tokens=max_tokens)
+    return history.recent(n * 2)
+
+
+def ai_request(query, history):
+    """
+    Inputs for an @ai turn: (prompt, recent history, context, data summary).
+    The data summary is what the LLM cache key is built from.
+    """
+    context = build_metrics_context(extract_metric(query))
+    # The client picks its own window; give it room to keep the window start stable
+    recent = get_recent_history(history, n=8) if history else None
+    return query, recent, context, context or ''
+
+
+def ask_ai(query, llm_client, max_tokens=300, stream=False, history=None):
+    """
+    Get AI response with latest metrics as context. With stream=True, returns a chunk generator.
+    history defaults to this terminal session's chat_history.
+    """
+    history = chat_history if history is None else history
+    prompt, recent, context, summary = ai_request(query, history)
+    key = make_key(normalize_query(query), llm_client.model, summary)
+    return cached_generate(llm_client, key, query, prompt, recent, context, max_tokens, stream)
+
+
+def cached_generate(llm_client, key, cache_query, prompt, history, context, max_tokens, stream):
+    """Serve from llm_cache when possible; otherwise call the LLM and store the answer once complete."""
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return [cached] if stream else cached
+    if stream:
+        return _store_when_done(
+            llm_client.generate_stream(prompt, history=history, context=context, max_tokens=max_tokens),
+            key, cache_query, llm_client.model,
+        )
+    response = llm_client.generate(prompt, history=history, context=context, max_tokens=max_tokens)
+    if not response.startswith(ERROR_PREFIX):
+        llm_cache.put(key, llm_client.model, cache_query, response)
+    return response
 
 
-def generate_advice_with_ai(query, metric, time_range_info, llm_client):
-    """Generate advice using AI, incorporating data from the specified time range."""
-    today = datetime.today()
+def _store_when_done(chunks, key, cache_query, model):
+    text = ""
+    failed = False
+    for chunk in chunks:
+        # The error can follow partial text, so the prefix check alone misses it
+        failed = failed or isinstance(chunk, StreamError)
+        text += chunk
+        yield chunk
+    text = text.strip()
+    if text and not failed:
+        llm_cache.put(key, model, cache_query, text)
+
+
+def render_stream(chunks, title="[bold magenta]AI Assistant[/bold magenta]"):
+    """
+    Render streamed chunks into a live-updating Markdown panel and return the full text.
+    Ctrl-C stops the stream and closes the connection; returns None in that case.
+    """
+    from rich.live import Live
+    from rich.markdown import Markdown
+    from rich.spinner import Spinner
+
+    text = ""
+    waiting = Panel(Spinner("dots", text="[bold green]Consulting AI...[/bold green]"),
+                    title=title, border_style="magenta")
+    with Live(waiting, console=console, refresh_per_second=12, transient=False) as live:
+        try:
+            for chunk in chunks:
+                text += chunk
+                live.update(Panel(Markdown(text), title=title, border_style="magenta"))
+        except KeyboardInterrupt:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+            live.update(Panel(Markdown(text.strip() or "*Cancelled.*"), title=title, border_style="yellow"))
+            console.print("[yellow]Cancelled.[/yellow]")
+            return None
+        text = text.strip()
+        live.update(Panel(Markdown(text), title=title, border_style="magenta"))
+    return text
+
+
+def show_llm_stats(llm_client):
+    if llm_cache.last_lookup_hit:
+        stats = llm_cache.stats()
+        console.print(f"[dim]Answered from LLM cache (hit rate {stats['hit_rate']:.0%}, "
+                      f"{stats['hits']} hits / {stats['misses']} misses)[/dim]")
+        return
+    stats = llm_client.last_stats
+    if stats:
+        prompt_tokens = stats.get('prompt_eval_count')
+        prompt_info = f", {prompt_tokens} prompt tokens evaluated" if prompt_tokens is not None else ""
+        console.print(f"[dim]First token {stats['ttft_s']:.2f}s, "
+                      f"{stats['tokens']} tokens at {stats['tokens_per_sec']:.1f} tok/s{prompt_info}[/dim]")
+
+
+def generate_advice_with_ai(query, metric, time_range_info, llm_client, stream=False, history=None, today=None):
+    """
+    Generate advice using AI, incorporating data from the specified time range.
+    With stream=True, returns a chunk generator. today defaults to the current date.
+    """
+    history = chat_history if history is None else history
+    prompt, recent, context, summary = advice_request(query, metric, time_range_info, history, today)
+    key = make_key(normalize_query(query), llm_client.model, summary)
+    return cached_generate(llm_client, key, query, prompt, recent, context, 500, stream)
+
+
+def advice_request(query, metric, time_range_info, history, today=None):
+    """Inputs for an advice turn: (prompt, recent history, context, data summary)."""
+    today = today or datetime.today()
     # Resolve time range
     if time_range_info:
         try:
@@ -137,7 +352,9 @@ def generate_advice_with_ai(query, metric, time_range_info, llm_client):
 
     # Fetch data for the range
     rows = []
+    pending = []
     if start and end:
+        pending = bootstrap.syncing(start, end)
         rows = fetch_metrics(start, end)
 
     # Summarize key metrics
@@ -163,6 +380,8 @@ def generate_advice_with_ai(query, metric, time_range_info, llm_client):
             summary = "No recent data available for key metrics."
     else:
         summary = "No data available for the specified period."
+    if pending:
+        summary += f"\n(Data for {len(pending)} days in this period is still syncing and not included.)"
 
     # Build the prompt
     if metric:
@@ -171,19 +390,38 @@ def generate_advice_with_ai(query, metric, time_range_info, llm_client):
         prompt = f"{query}\n\n{summary}\n\nProvide helpful health advice based on the data."
 
     # Get recent history for context
-    recent = get_recent_history(chat_history, n=5) if chat_history else None
+    recent = get_recent_history(history, n=8) if history else None
     # Also include latest metrics as extra context
-    from src.data.cache import get_latest_metrics
-    latest = get_latest_metrics()
-    context = None
-    if latest:
-        context = f"Latest metrics: {dict(latest)}"
-    response = llm_client.generate(prompt, history=recent, context=context, max_tokens=500)
-    return response
-
-
-def main():
+    context = build_metrics_context(metric)
+    return prompt, recent, context, summary
+
+
+def route_query(query, intent_model, router, today=None):
+    """
+    Parse a query and decide how to answer it.
+    Returns (parsed, intent, similarity): intent is a data intent when the query
+    can be answered from the store (similarity > 0 if the router picked it),
+    otherwise None or 'advice' and the LLM answers.
+    """
+    parsed = parse_query(query, intent_model, today)
+    intent = parsed.intent
+    similarity = 0.0
+    # Paraphrases of known data questions can be answered without the LLM
+    if (intent is None or intent == 'advice') and parsed.metric:
+        with span('nlu.route'):
+            routed_intent, score = router.route(query)
+        if routed_intent:
+            intent, similarity = routed_intent, score
+    return parsed, intent, similarity
+
+
+def main(on_ready=None):
+    """
+    Run the chat loop. on_ready, if given, is called just before the first
+    prompt is shown (used to measure startup time).
+    """
     global chat_history
+    setup_started = time.perf_counter()
 
     console.print(Panel.fit(
         "[bold cyan]AI Health Coach[/bold cyan]\n"
@@ -195,13 +433,28 @@ def main():
         border_style="green"
     ))
 
-    # Load classifier
-    vectorizer, classifier = load_classifier()
+    # Load the classifier and router in the background while the user types;
+    # the first query waits for them if they aren't ready yet
+    check_model_files()
+    loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix='model-loader')
+    models = loader.submit(load_models)
+    loader.shutdown(wait=False)
+    intent_model = router = None
+
+    # Initial LLM client; load the model in the background while the user types
+    llm_client = OllamaClient(static_context=LLM_STATIC_CONTEXT)
+    llm_client.warm_up_async()
 
-    # Initial LLM client
-    llm_client = OllamaClient()
+    # Write out any history still waiting for a batch, however we exit
+    atexit.register(history_store.flush)
+
+    startup_timings['chat_setup'] = time.perf_counter() - setup_started
+    if on_ready is not None:
+        on_ready()
 
     while True:
+        # The previous turn, if it was profiled, ends here
+        show_profile_reports(profiler.end())
         try:
             query = Prompt.ask("[bold yellow]You[/bold yellow]")
         except (KeyboardInterrupt, EOFError):
@@ -225,9 +478,23 @@ def main():
                 continue
             elif cmd == '/new_chat':
                 clear_screen()
-                chat_history.clear()
+                history_store.flush()
+                chat_history = history_store.new_session()
                 console.print("[green]Started a new chat.[/green]")
                 continue
+            elif cmd == '/sessions':
+                show_sessions()
+                continue
+            elif cmd == '/resume':
+                resumed = resume_session(cmd_parts[1] if len(cmd_parts) > 1 else None)
+                if resumed is None:
+                    console.print("[yellow]No matching session to resume.[/yellow]")
+                else:
+                    chat_history = resumed
+                    console.print(f"[green]Resumed session {resumed.session_id[:8]} "
+                                  f"({len(resumed)} messages).[/green]")
+                    show_history()
+                continue
             elif cmd == '/update':
                 days = 7
                 if len(cmd_parts) > 1:
@@ -239,12 +506,47 @@ def main():
                     success, total = fetch_recent_days(days)
                 console.print(f"[green]Fetched {success}/{total} days successfully.[/green]")
                 continue
+            elif cmd == '/sync':
+                show_sync()
+                continue
             elif cmd == '/history':
                 show_history()
                 continue
+            elif cmd == '/llm_cache':
+                action = cmd_parts[1].lower() if len(cmd_parts) > 1 else 'stats'
+                if action == 'on':
+                    llm_cache.enabled = True
+                elif action == 'off':
+                    llm_cache.enabled = False
+                elif action == 'clear':
+                    llm_cache.clear()
+                stats = llm_cache.stats()
+                console.print(f"[green]LLM cache {'on' if stats['enabled'] else 'off'}: "
+                              f"{stats['size']} entries, {stats['hits']} hits / {stats['misses']} misses "
+                              f"(hit rate {stats['hit_rate']:.0%})[/green]")
+                continue
             elif cmd == '/metrics':
                 show_metrics()
                 continue
+            elif cmd == '/stats':
+                if len(cmd_parts) > 1 and cmd_parts[1].lower() == 'reset':
+                    recorder.reset()
+                    console.print("[green]Timings reset.[/green]")
+                else:
+                    show_stats(router)
+                continue
+            elif cmd == '/profile':
+                profile_command(cmd_parts[1:])
+                continue
+            elif cmd == '/trace':
+                target = cmd_parts[1] if len(cmd_parts) > 1 else os.path.join('data', 'traces', 'chat.jsonl')
+                if target.lower() == 'off':
+                    recorder.stop_trace()
+                    console.print("[green]Tracing off.[/green]")
+                else:
+                    recorder.start_trace(target)
+                    console.print(f"[green]Tracing every stage to {target}[/green]")
+                continue
             elif cmd == '/help':
                 print_help()
                 continue
@@ -255,51 +557,49 @@ def main():
                 console.print(f"[red]Unknown command: {cmd}. Type /help for available commands.[/red]")
                 continue
 
+        new_turn()
+        profiler.begin()
         # Check for @ai prefix
         if query.lower().startswith(('@ai', '@ai ', '@ai?')):
             clean_query = query[4:].strip()
             if not clean_query:
                 console.print("[yellow]Please ask a question after @ai[/yellow]")
                 continue
-            with console.status("[bold green]Consulting AI...[/bold green]"):
-                response = ask_ai(clean_query, llm_client, max_tokens=300)
+            response = render_stream(ask_ai(clean_query, llm_client, max_tokens=300, stream=True))
+            if response is None:
+                continue
+            show_llm_stats(llm_client)
 
-                # Track History
-                chat_history.append(("user", query))
-                chat_history.append(("assistant", response))
-
-                # Trim if exceeds MAX_HISTORY
-                if len(chat_history) > MAX_HISTORY * 2:
-                    chat_history = chat_history[-(MAX_HISTORY * 2):]
-            console.print(Panel(
-                Markdown(response),
-                title="[bold magenta]AI Assistant[/bold magenta]",
-                border_style="magenta"
-            ))
+            # Track History
+            chat_history.add_turn(query, response)
             continue
 
         # Process query
         with console.status("[bold green]Thinking...[/bold green]"):
-            # Predict intent
-            intent, confidence, proba = predict_intent_with_confidence(vectorizer, classifier, query)
-            console.print(f"[dim]Predicted: {intent} with confidence {confidence:.2f}[/dim]")
+            if intent_model is None:
+                intent_model, router = models.result()
+
+            # Predict intent and extract entities in one pass
+            parsed, intent, similarity = route_query(query, intent_model, router)
+            console.print(f"[dim]Predicted: {parsed.intent} with confidence {parsed.confidence:.2f}[/dim]")
+            if parsed.intent is None:
+                # Keep low-confidence queries so they can be labeled for online updates
+                log_query(query, parsed.intent, parsed.confidence)
+            if similarity:
+                console.print(f"[dim]Routed to {intent} by similarity {similarity:.2f} "
+                              f"(LLM calls avoided: {router.routed})[/dim]")
 
             if intent is not None and intent != 'advice':
-                # Extract entities
-                metric = extract_metric(query)
-                time_info = extract_time_range(query)
-
                 # Generate response
-                response = generate_response(intent, metric, time_info)
+                response = generate_response(intent, parsed.metric, parsed.time_info)
+                # Only confident classifications teach the router; a routed guess would reinforce itself
+                if not similarity:
+                    router.add(query, intent)
 
                 # Track History
-                chat_history.append(("user", query))
-                chat_history.append(("assistant", response))
-
-                # Trim if exceeds MAX_HISTORY
-                if len(chat_history) > MAX_HISTORY * 2:
-                    chat_history = chat_history[-(MAX_HISTORY * 2):]
+                chat_history.add_turn(query, response)
 
+                from rich.markdown import Markdown
                 console.print(Panel(
                     Markdown(response),
                     title=f"[bold blue]{intent.replace('_', ' ').title()}[/bold blue]",
@@ -307,26 +607,16 @@ def main():
                 ))
                 continue
 
-        with console.status("[bold green]Consulting AI...[/bold green]"):
-            # Extract entities
-            metric = extract_metric(query)
-            time_info = extract_time_range(query)
-
-            response = generate_advice_with_ai(query, metric, time_info, llm_client)
-
-            # Track history
-            chat_history.append(("user", query))
-            chat_history.append(("assistant", response))
-
-            if len(chat_history) > MAX_HISTORY * 2:
-                chat_history = chat_history[-(MAX_HISTORY * 2):]
+        # Stream the response into a live panel
+        response = render_stream(
+            generate_advice_with_ai(query, parsed.metric, parsed.time_info, llm_client, stream=True)
+        )
+        if response is None:
+            continue
+        show_llm_stats(llm_client)
 
-        # Display response
-        console.print(Panel(
-            Markdown(response),
-            title="[bold magenta]AI Assistant[/bold magenta]",
-            border_style="magenta"
-        ))
+        # Track history once the full response is in
+        chat_history.add_turn(query, response)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+"""
+Compact intent model: the trained TF-IDF vocabulary and linear classifier
+weights exported to a single .npz, with NumPy-only transform and
+predict_proba. Loading it avoids importing scikit-learn and joblib at startup.
+"""
+
+import os
+import re
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+COMPACT_MODEL_PATH = os.path.join('models', 'intent_compact.npz')
+
+# Classifiers whose predict_proba is a linear score plus a fixed link function
+SOFTMAX = 'softmax'
+OVR = 'ovr'
+
+
+class CompactVectorizer:
+    """Word n-gram TF-IDF matching a fitted TfidfVectorizer with default preprocessing."""
+
+    def __init__(self, terms, idf, ngram_range, stop_words, token_pattern, sublinear_tf, norm):
+        self.vocabulary: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.idf = idf
+        self.ngram_range = ngram_range
+        self.stop_words = frozenset(stop_words)
+        self._token_re = re.compile(token_pattern)
+        self.sublinear_tf = sublinear_tf
+        self.norm = norm
+
+    def _features(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        tokens = [t for t in self._token_re.findall(text.lower()) if t not in self.stop_words]
+        counts: Dict[int, int] = {}
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            for i in range(len(tokens) - n + 1):
+                index = self.vocabulary.get(' '.join(tokens[i:i + n]))
+                if index is not None:
+                    counts[index] = counts.get(index, 0) + 1
+        indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.sublinear_tf:
+            values = np.log(values) + 1.0
+        values *= self.idf[indices]
+        if self.norm == 'l2':
+            length = np.sqrt(values @ values)
+            if length > 0:
+                values /= length
+        return indices, values
+
+    def transform(self, texts: List[str]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """One sparse (indices, values) row per text, for CompactClassifier."""
+        return [self._features(text) for text in texts]
+
+
+class CompactClassifier:
+    def __init__(self, classes, coef, intercept, link):
+        self.classes_ = classes
+        self.coef = coef
+        self.intercept = intercept
+        self.link = link
+
+    def predict_proba(self, rows: List[Tuple[np.ndarray, np.ndarray]]) -> np.ndarray:
+        scores = np.tile(self.intercept, (len(rows), 1))
+        for r, (indices, values) in enumerate(rows):
+            if len(indices):
+                scores[r] += self.coef[:, indices] @ values
+        if self.link == SOFTMAX:
+            scores -= scores.max(axis=1, keepdims=True)
+            proba = np.exp(scores)
+        else:
+            proba = 1.0 / (1.0 + np.exp(-scores))
+        return proba / proba.sum(axis=1, keepdims=True)
+
+
+def load_compact(path: str = COMPACT_MODEL_PATH) -> Tuple[CompactVectorizer, CompactClassifier]:
+    data = np.load(path, allow_pickle=False)
+    vectorizer = CompactVectorizer(
+        [str(t) for t in data['terms']], data['idf'], tuple(int(n) for n in data['ngram_range']),
+        [str(w) for w in data['stop_words']], str(data['token_pattern']),
+        bool(data['sublinear_tf']), str(data['norm']),
+    )
+    classifier = CompactClassifier(data['classes'], data['coef'], data['intercept'], str(data['link']))
+    return vectorizer, classifier
+
+
+def export_compact(vectorizer, classifier, path: str = COMPACT_MODEL_PATH, check_texts=()) -> bool:
+    """
+    Write a fitted TfidfVectorizer and linear classifier (LogisticRegression,
+    SGDClassifier with log loss, or a naive Bayes model) as a compact model.
+    Returns False without writing when the pair can't be reproduced exactly,
+    checked against check_texts (default: the vocabulary terms themselves).
+    """
+    params = vectorizer.get_params()
+    if (params['analyzer'] != 'word' or params['tokenizer'] or params['preprocessor']
+            or params['strip_accents'] or params['binary'] or not params['use_idf']):
+        return False
+
+    if hasattr(classifier, 'feature_log_prob_'):
+        # Naive Bayes: joint log likelihood is linear in the features
+        coef = classifier.feature_log_prob_
+        intercept = np.zeros(len(classifier.classes_))
+        if hasattr(classifier, 'class_log_prior_') and type(classifier).__name__ != 'ComplementNB':
+            intercept = classifier.class_log_prior_
+        links = [SOFTMAX]
+    elif hasattr(classifier, 'coef_') and len(classifier.classes_) > 2:
+        coef, intercept = classifier.coef_, classifier.intercept_
+        links = [SOFTMAX, OVR]
+    else:
+        return False
+
+    vocabulary = vectorizer.vocabulary_
+    terms = np.empty(len(vocabulary), dtype=object)
+    for term, index in vocabulary.items():
+        terms[index] = term
+    arrays = dict(
+        terms=terms.astype(str), idf=vectorizer.idf_, ngram_range=np.array(params['ngram_range']),
+        stop_words=np.array(sorted(vectorizer.get_stop_words() or []), dtype=str),
+        token_pattern=np.array(params['token_pattern']), sublinear_tf=np.array(params['sublinear_tf']),
+        norm=np.array(str(params['norm'])), classes=np.asarray(classifier.classes_).astype(str),
+        coef=np.asarray(coef, dtype=np.float64), intercept=np.asarray(intercept, dtype=np.float64),
+    )
+
+    texts = list(check_texts) or list(arrays['terms'][:500])
+    expected = classifier.predict_proba(vectorizer.transform(texts))
+    for link in links:
+        compact_vec = CompactVectorizer(arrays['terms'], arrays['idf'], tuple(params['ngram_range']),
+                                        arrays['stop_words'], params['token_pattern'],
+                                        params['sublinear_tf'], str(params['norm']))
+        compact_clf = CompactClassifier(arrays['classes'], arrays['coef'], arrays['intercept'], link)
+        if np.allclose(compact_clf.predict_proba(compact_vec.transform(texts)), expected, atol=1e-6):
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            # Written aside and renamed, so a concurrent load never sees a partial file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, link=np.array(link), **arrays)
+            os.replace(tmp, path)
+            return True
+    return False
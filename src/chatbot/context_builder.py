@@ -0,0 +1,59 @@
+"""
+Compact metric context for LLM prompts.
+Serializes only the relevant metrics, with units and a recent baseline, instead
+of the full database row (which includes the raw API payload).
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.data.cache import fetch_metrics, get_latest_metrics
+from src.data.metrics import METRIC_NAMES as ALL_METRICS, format_metric
+
+KEY_METRICS = ['recovery_score', 'sleep_score', 'hrv_avg', 'rhr_avg', 'total_steps', 'active_minutes']
+
+BASELINE_DAYS = 7
+
+
+def _baselines(metrics: List[str], before: date) -> Dict[str, float]:
+    """Average of each metric over the BASELINE_DAYS days before `before`."""
+    rows = fetch_metrics(before - timedelta(days=BASELINE_DAYS), before - timedelta(days=1))
+    baselines = {}
+    for m in metrics:
+        values = [row[m] for row in rows if row[m] is not None]
+        if values:
+            baselines[m] = sum(values) / len(values)
+    return baselines
+
+
+def build_metrics_context(metric: Optional[str] = None, latest_row=None) -> Optional[str]:
+    """
+    One-line summary of the latest day's relevant metrics with units and
+    7-day baselines, e.g. "Latest (2025-02-20): hrv_avg 55 ms (7d avg 52 ms); ...".
+    With a metric, that metric leads, followed by the key metrics; otherwise
+    every metric with data is included.
+    """
+    if latest_row is None:
+        latest_row = get_latest_metrics()
+    if not latest_row:
+        return None
+    if metric:
+        metrics = [metric] + [m for m in KEY_METRICS if m != metric]
+    else:
+        metrics = ALL_METRICS
+    metrics = [m for m in metrics if latest_row[m] is not None]
+    if not metrics:
+        return None
+
+    latest_date = date.fromisoformat(latest_row['date'])
+    baselines = _baselines(metrics, latest_date)
+    parts = []
+    for m in metrics:
+        part = f"{m} {format_metric(m, latest_row[m])}"
+        if m in baselines:
+            part += f" ({BASELINE_DAYS}d avg {format_metric(m, baselines[m])})"
+        parts.append(part)
+    return f"Latest ({latest_row['date']}): " + "; ".join(parts)
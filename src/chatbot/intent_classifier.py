@@ -0,0 +1,122 @@
+"""
+Intent classifier wrapper: single-query prediction with an LRU cache in front,
+and batched prediction for log replay and evaluation.
+"""
+
+import logging
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_CACHE_SIZE = 1024
+MODELS_DIR = 'models'
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(query_lower: str) -> List[str]:
+    """Split an already lowercased query into word tokens."""
+    return _WORD_RE.findall(query_lower)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Lowercase and keep only word characters, single-space separated.
+    The TF-IDF tokenizer ignores case and punctuation, so queries that
+    normalize to the same text always get the same prediction.
+    """
+    return ' '.join(tokenize(query.lower()))
+
+
+def predict_intent_with_confidence(vectorizer, classifier, query: str, threshold=DEFAULT_THRESHOLD):
+    query_vec = vectorizer.transform([query])
+    proba = classifier.predict_proba(query_vec)[0]
+    max_prob = max(proba)
+    if max_prob < threshold:
+        return None, max_prob, None
+    intent = classifier.classes_[proba.argmax()]
+    return intent, max_prob, proba
+
+
+class IntentClassifier:
+    def __init__(self, vectorizer, classifier, threshold=DEFAULT_THRESHOLD, cache_size=DEFAULT_CACHE_SIZE):
+        self.vectorizer = vectorizer
+        self.classifier = classifier
+        self.threshold = threshold
+        # Cache keyed by normalized query text; lru_cache tracks hits/misses for us
+        self._predict_cached = lru_cache(maxsize=cache_size)(self._predict_normalized)
+
+    @classmethod
+    def load(cls, models_dir: str = MODELS_DIR, **kwargs) -> 'IntentClassifier':
+        """
+        Load the trained model from models_dir. The compact NumPy export is used
+        while it is at least as new as the pickles; otherwise the pickles are
+        loaded with joblib (which imports scikit-learn) and the compact export
+        is refreshed for the next start when models_dir is writable.
+        """
+        from src.chatbot.compact_model import export_compact, load_compact
+
+        compact_path = os.path.join(models_dir, 'intent_compact.npz')
+        pickles = [os.path.join(models_dir, name) for name in ('vectorizer.pkl', 'intent_classifier.pkl')]
+        if os.path.exists(compact_path) and all(
+                not os.path.exists(p) or os.path.getmtime(p) <= os.path.getmtime(compact_path) for p in pickles):
+            return cls(*load_compact(compact_path), **kwargs)
+
+        import joblib
+        vectorizer, classifier = (joblib.load(p) for p in pickles)
+        try:
+            export_compact(vectorizer, classifier, compact_path)
+        except OSError as e:
+            # e.g. a read-only deployment: serve from the pickles, just without the faster start next time
+            logger.warning("Could not write %s: %s", compact_path, e)
+        return cls(vectorizer, classifier, **kwargs)
+
+    def _predict_normalized(self, normalized: str):
+        return predict_intent_with_confidence(self.vectorizer, self.classifier, normalized, self.threshold)
+
+    def predict(self, query: str):
+        """Return (intent, confidence, proba) for one query, served from cache when possible."""
+        return self._predict_cached(normalize_query(query))
+
+    def predict_normalized(self, normalized: str):
+        """Same as predict() for text already passed through normalize_query."""
+        return self._predict_cached(normalized)
+
+    def predict_many(self, queries: Iterable[str]) -> List[Tuple[Optional[str], float, Optional[object]]]:
+        """
+        Classify a batch of queries with one vectorizer/classifier call.
+        Returns results in input order, in the same format as predict().
+        Bypasses the cache so replays measure the model, not the cache.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        matrix = self.vectorizer.transform([normalize_query(q) for q in queries])
+        probas = self.classifier.predict_proba(matrix)
+        best = probas.argmax(axis=1)
+        classes = self.classifier.classes_
+        results = []
+        for proba, idx in zip(probas, best):
+            max_prob = proba[idx]
+            if max_prob < self.threshold:
+                results.append((None, max_prob, None))
+            else:
+                results.append((classes[idx], max_prob, proba))
+        return results
+
+    def cache_info(self) -> Dict[str, int]:
+        """Return cache hit/miss counters and current size."""
+        info = self._predict_cached.cache_info()
+        return {
+            'hits': info.hits,
+            'misses': info.misses,
+            'size': info.currsize,
+            'max_size': info.maxsize,
+        }
+
+    def cache_clear(self) -> None:
+        self._predict_cached.cache_clear()
@@ -1,62 +1,286 @@
-import requests
+import json
+import logging
+import threading
+import time
 
+from src.perf.spans import recorder
 
-class OllamaClient:
-    def __init__(self, model="llama3.2:latest", base_url="http://localhost:11434"):
-        self.model = model
-        self.base_url = base_url
+logger = logging.getLogger(__name__)
 
-    def generate(self, query, history=None, context=None, max_tokens=300):
+# Prefix of the text returned instead of an answer when the server call fails
+ERROR_PREFIX = "Error communicating with LLM"
+
+
+class StreamError(str):
+    """
+    The error line a response stream yields when it fails, possibly after
+    partial text. A stream that yields one never reached "done", so its text
+    must not be cached or treated as an answer.
+    """
+
+# System instruction to enforce topic boundaries
+SYSTEM_PROMPT = (
+    "You are a helpful AI health coach. You have access to the user's conversation history as context, "
+    "but your task is to answer only the user's latest question. "
+    "If the latest question is about health, fitness, wellness, nutrition, or related to the user's personal health data, "
+    "provide a concise answer. "
+    "If the question is off-topic (e.g., weather, news, politics, general knowledge, personal questions about yourself), "
+    "respond with exactly: 'I'm not sure how to answer that.' without any additional commentary. "
+    "Do not reference the conversation history unless it directly helps answer the current question about health. "
+    "Keep answers concise and focused on the question."
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token for English text)."""
+    return len(text) // 4 + 1
+
+
+class PromptBuilder:
+    """
+    Per-conversation prompt layout. Holds the history window state, so each
+    chat session needs its own builder even when sessions share one client.
+    """
+
+    def __init__(self, static_context=None, history_window=10, history_slack=6,
+                 max_prompt_tokens=1500, history_message_chars=600, history_trim_to=0.5):
+        # Prompt token budget; the oldest history is dropped first to stay under it
+        self.max_prompt_tokens = max_prompt_tokens
+        # Share of the history budget kept when the budget forces a trim, leaving room for later turns
+        self.history_trim_to = history_trim_to
+        # Longer history messages are cut to this many characters
+        self.history_message_chars = history_message_chars
+        # Context that never changes within a session; sits right after the system prompt
+        self.static_context = static_context
+        # History is windowed to history_window entries, but the window start only
+        # moves once it falls history_slack entries behind, so the prompt prefix
+        # (and Ollama's cached KV for it) survives several turns in a row
+        self.history_window = history_window
+        self.history_slack = history_slack
+        self._window_anchor = None
+
+    def build(self, query, history=None, context=None):
         """
-        Generate a response with strict instructions.
+        Build the prompt text for one turn.
         - history: list of (role, message) tuples (user/assistant)
-        - context: optional extra context (e.g., latest metrics)
-        """
-        # System instruction to enforce topic boundaries
-        system = (
-            "You are a helpful AI health coach. You have access to the user's conversation history as context, "
-            "but your task is to answer only the user's latest question. "
-            "If the latest question is about health, fitness, wellness, nutrition, or related to the user's personal health data, "
-            "provide a concise answer. "
-            "If the question is off-topic (e.g., weather, news, politics, general knowledge, personal questions about yourself), "
-            "respond with exactly: 'I'm not sure how to answer that.' without any additional commentary. "
-            "Do not reference the conversation history unless it directly helps answer the current question about health. "
-            "Keep answers concise and focused on the question."
-        )
-
-        # Build conversation with clear separation
+        - context: optional per-turn context (e.g., latest metrics)
+
+        The prompt is laid out from most to least stable: system prompt, static
+        context, history, then per-turn context and the query. Ollama reuses the
+        KV cache for any prefix that matches the previous request, so each turn
+        only pays for the tokens after the first difference.
+        """
         conversation = ""
-        if history:
-            # Show last 5 exchanges (10 lines) as context
-            recent = history[-10:] if len(history) > 10 else history
-            for role, msg in recent:
-                prefix = "User" if role == "user" else "Assistant"
-                conversation += f"{prefix}: {msg}\n"
-        else:
-            conversation = "No previous conversation.\n"
+        if self.static_context:
+            conversation += f"Background: {self.static_context}\n\n"
 
+        # Per-turn context goes after the history so data changes don't invalidate the prefix
+        tail = ""
+        if context:
+            tail += f"\nContext: {context}\n"
         # Add current query explicitly
-        conversation += f"Current user query: {query}\nAssistant:"
+        tail += f"Current user query: {query}\nAssistant:"
 
-        # Prepend any additional context (like latest metrics)
-        if context:
-            conversation = f"Context: {context}\n\n{conversation}"
+        # Build conversation with clear separation, within what's left of the token budget
+        budget = self.max_prompt_tokens - estimate_tokens(SYSTEM_PROMPT + conversation + tail)
+        lines = self._fit_history(self._history_window(history), budget)
+        if lines:
+            conversation += "".join(lines)
+        else:
+            conversation += "No previous conversation.\n"
+        conversation += tail
+        return conversation
 
-        url = f"{self.base_url}/api/generate"
-        payload = {
-            "model": self.model,
-            "prompt": conversation,
-            "system": system,
-            "stream": False,
-            "options": {
-                "num_predict": max_tokens,
-                "stop": ["\nUser:", "\nAssistant:", "\nCurrent user query:"]
-            }
+    def _fit_history(self, window, budget):
+        """
+        Format history lines, cutting long messages, and drop the oldest
+        lines until they fit in `budget` tokens.
+        """
+        lines = []
+        for role, msg in window:
+            prefix = "User" if role == "user" else "Assistant"
+            if len(msg) > self.history_message_chars:
+                msg = msg[:self.history_message_chars].rstrip() + " ..."
+            lines.append(f"{prefix}: {msg}\n")
+        tokens = [estimate_tokens(line) for line in lines]
+        total = sum(tokens)
+        dropped = 0
+        if total > budget:
+            # Trim well below the budget: dropping just enough would move the
+            # window start (and the cached prefix) one exchange every turn
+            target = budget * self.history_trim_to
+            while dropped < len(lines) and total > target:
+                total -= tokens[dropped]
+                dropped += 1
+        if dropped:
+            # Restart the window where the kept history begins
+            self._window_anchor = window[dropped] if dropped < len(window) else None
+        return lines[dropped:]
+
+    def _history_window(self, history):
+        """
+        Return the tail of history to include, keeping the same first entry as
+        the previous call while the window is at most history_window + history_slack.
+        """
+        if not history:
+            self._window_anchor = None
+            return []
+        start = None
+        if self._window_anchor is not None:
+            lo = max(0, len(history) - self.history_window - self.history_slack)
+            for i in range(lo, len(history)):
+                if history[i] == self._window_anchor:
+                    start = i
+                    break
+        if start is None:
+            start = max(0, len(history) - self.history_window)
+        self._window_anchor = history[start]
+        return history[start:]
+
+
+def make_payload(model, prompt, keep_alive, max_tokens=300, stream=False):
+    """The /api/generate request body shared by the sync and async clients."""
+    return {
+        "model": model,
+        "prompt": prompt,
+        "system": SYSTEM_PROMPT,
+        "stream": stream,
+        "keep_alive": keep_alive,
+        "options": {
+            "num_predict": max_tokens,
+            "stop": ["\nUser:", "\nAssistant:", "\nCurrent user query:"]
         }
+    }
+
+
+def call_stats(start, first_token_at, final, chunks=None):
+    """Timing summary for one call from its start time and the final Ollama message."""
+    total = time.perf_counter() - start
+    # Prefer the server's own counters; fall back to counting streamed chunks
+    tokens = final.get("eval_count", chunks or 0)
+    eval_seconds = final.get("eval_duration", 0) / 1e9
+    if not eval_seconds:
+        eval_seconds = total - ((first_token_at - start) if first_token_at else 0)
+    stats = {
+        "ttft_s": (first_token_at - start) if first_token_at else total,
+        "total_s": total,
+        "tokens": tokens,
+        "tokens_per_sec": tokens / eval_seconds if eval_seconds > 0 else 0.0,
+        # Tokens the server actually evaluated; a cached prefix is not counted
+        "prompt_eval_count": final.get("prompt_eval_count"),
+        "prompt_eval_s": final.get("prompt_eval_duration", 0) / 1e9,
+    }
+    recorder.record("llm.ttft", stats["ttft_s"])
+    recorder.record("llm.total", total, tokens=tokens)
+    logger.debug("prompt_eval_count=%s prompt_eval_s=%.3f ttft_s=%.3f",
+                 stats["prompt_eval_count"], stats["prompt_eval_s"], stats["ttft_s"])
+    return stats
+
+
+class OllamaClient:
+    def __init__(self, model="llama3.2:latest", base_url="http://localhost:11434", keep_alive="30m",
+                 timeout=(5, 120), **prompt_options):
+        self.model = model
+        self.base_url = base_url
+        # Prompt layout options (static_context, history_window, max_prompt_tokens, ...)
+        self.prompt = PromptBuilder(**prompt_options)
+        # How long Ollama keeps the model loaded after a request (e.g. "30m", "-1" for forever)
+        self.keep_alive = keep_alive
+        # (connect, read) seconds; the read timeout applies between streamed chunks
+        self.timeout = timeout
+        # Timing of the most recent call: time to first token, token count, tokens/sec
+        self.last_stats = {}
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.warmed_up = threading.Event()
+
+    @property
+    def session(self):
+        """
+        One pooled session so every turn reuses the same TCP connection.
+        Created on first use, so requests is imported off the startup path
+        (usually by the warm-up thread).
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+                    self._session = session
+        return self._session
+
+    def build_payload(self, query, history=None, context=None, max_tokens=300, stream=False):
+        """Build the /api/generate payload; see PromptBuilder.build for the layout."""
+        prompt = self.prompt.build(query, history, context)
+        return make_payload(self.model, prompt, self.keep_alive, max_tokens, stream)
+
+    def generate(self, query, history=None, context=None, max_tokens=300):
+        """Generate a complete response in one blocking call."""
+        url = f"{self.base_url}/api/generate"
+        payload = self.build_payload(query, history, context, max_tokens, stream=False)
+        start = time.perf_counter()
         try:
-            response = requests.post(url, json=payload)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             data = response.json()
+            self.last_stats = call_stats(start, None, data)
             return data.get("response", "Sorry, I couldn't generate a response.").strip()
         except Exception as e:
-            return f"Error communicating with LLM: {e}"
\ No newline at end of file
+            return f"{ERROR_PREFIX}: {e}"
+
+    def generate_stream(self, query, history=None, context=None, max_tokens=300):
+        """
+        Yield response text chunks as Ollama produces them.
+        Ollama streams one JSON object per line; the last one has "done": true
+        and carries the eval counters.
+        """
+        url = f"{self.base_url}/api/generate"
+        payload = self.build_payload(query, history, context, max_tokens, stream=True)
+        start = time.perf_counter()
+        first_token_at = None
+        chunks = 0
+        try:
+            with self.session.post(url, json=payload, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    text = data.get("response", "")
+                    if text:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                        chunks += 1
+                        yield text
+                    if data.get("done"):
+                        self.last_stats = call_stats(start, first_token_at, data, chunks)
+                        return
+            raise ConnectionError("response ended before it was done")
+        except Exception as e:
+            yield StreamError(f"{ERROR_PREFIX}: {e}")
+
+    def warm_up(self):
+        """
+        Ask Ollama to load the model without generating anything (an empty
+        prompt only loads it), so the first real question skips the load time.
+        """
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "prompt": "", "keep_alive": self.keep_alive},
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+            return True
+        except Exception:
+            return False
+        finally:
+            self.warmed_up.set()
+
+    def warm_up_async(self):
+        """Run warm_up in a daemon thread and return immediately."""
+        thread = threading.Thread(target=self.warm_up, name="ollama-warm-up", daemon=True)
+        thread.start()
+        return thread
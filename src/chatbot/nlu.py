@@ -0,0 +1,68 @@
+"""
+Single-pass NLU front end: normalize and tokenize a query once, then run
+intent classification, metric extraction and time range extraction over
+the shared text.
+"""
+
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot.entity_extractor import match_metric, match_time_range
+from src.chatbot.intent_classifier import tokenize
+from src.perf.spans import recorder
+
+
+@dataclass
+class ParsedQuery:
+    text: str
+    lower: str
+    tokens: List[str]
+    intent: Optional[str] = None
+    confidence: float = 0.0
+    proba: Any = None
+    metric: Optional[str] = None
+    time_info: Optional[Tuple] = None
+    timings: Dict[str, float] = field(default_factory=dict)  # stage -> seconds
+
+    @property
+    def normalized(self) -> str:
+        return ' '.join(self.tokens)
+
+
+def parse_query(query: str, intent_model, today: date = None) -> ParsedQuery:
+    """
+    Run the whole NLU front end on one query.
+    intent_model is an IntentClassifier; the returned ParsedQuery carries
+    the intent, entities and per-stage timings.
+    """
+    t_start = time.perf_counter()
+    lower = query.lower()
+    tokens = tokenize(lower)
+    parsed = ParsedQuery(text=query, lower=lower, tokens=tokens)
+    has_digit = any(ch.isdigit() for tok in tokens for ch in tok)
+    t_norm = time.perf_counter()
+
+    parsed.intent, parsed.confidence, parsed.proba = intent_model.predict_normalized(parsed.normalized)
+    t_intent = time.perf_counter()
+
+    parsed.metric = match_metric(lower)
+    t_metric = time.perf_counter()
+
+    parsed.time_info = match_time_range(lower, today, has_digit=has_digit)
+    t_time = time.perf_counter()
+
+    parsed.timings = {
+        'normalize': t_norm - t_start,
+        'intent': t_intent - t_norm,
+        'metric': t_metric - t_intent,
+        'time_range': t_time - t_metric,
+        'total': t_time - t_start,
+    }
+    recorder.record('nlu.intent', t_intent - t_norm)
+    recorder.record('nlu.entities', t_time - t_intent)
+    return parsed
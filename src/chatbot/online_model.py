@@ -0,0 +1,171 @@
+"""
+Incrementally trainable intent model: HashingVectorizer + SGDClassifier.
+The hashing vectorizer is stateless, so new labeled queries can be folded in
+with partial_fit in small batches instead of retraining from scratch.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot.intent_classifier import IntentClassifier, normalize_query
+from src.chatbot.templates import TEMPLATES
+
+ONLINE_MODEL_PATH = os.path.join('models', 'online_intent_model.pkl')
+QUERY_LOG_PATH = os.path.join('data', 'query_log.jsonl')
+
+INTENTS = list(TEMPLATES.keys())
+
+# Share of the synthetic corpus never trained on, used to check the model before it is saved
+HOLDOUT_FRACTION = 0.1
+# Held-out accuracy a model needs to be saved and to replace the trained classifier in the chat
+MIN_ACCURACY = 0.9
+
+
+class OnlineIntentModel:
+    def __init__(self, classes: Optional[List[str]] = None, n_features: int = 2 ** 18):
+        # scikit-learn is imported here so that importing this module (e.g. for
+        # log_query) stays cheap
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import SGDClassifier
+
+        self.classes = list(classes or INTENTS)
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            ngram_range=(1, 2),
+            alternate_sign=False,
+            norm='l2',
+        )
+        # log_loss gives predict_proba, so the model plugs into IntentClassifier
+        self.classifier = SGDClassifier(loss='log_loss', alpha=1e-5, random_state=42)
+        self.n_seen = 0
+        # Held-out accuracy measured when the model was last saved
+        self.holdout_accuracy: Optional[float] = None
+        # Keys of query log entries already folded in, so reruns don't apply them again
+        self.applied_log: Set[str] = set()
+
+    def partial_fit(self, queries: List[str], intents: List[str]) -> None:
+        """Update the model with one mini-batch of labeled queries."""
+        if not queries:
+            return
+        X = self.vectorizer.transform([normalize_query(q) for q in queries])
+        self.classifier.partial_fit(X, intents, classes=self.classes)
+        self.n_seen += len(queries)
+
+    def fit_epochs(self, examples: Iterable[Tuple[str, str]], epochs: int = 5, batch_size: int = 256,
+                   seed: int = 42) -> int:
+        """
+        Several shuffled passes of partial_fit over (query, intent) pairs. A
+        single pass in file order would mostly remember the last intents seen.
+        Returns the number of examples.
+        """
+        examples = list(examples)
+        rng = random.Random(seed)
+        for _ in range(epochs):
+            rng.shuffle(examples)
+            for queries, intents in iter_batches(examples, batch_size):
+                self.partial_fit(queries, intents)
+        return len(examples)
+
+    def accuracy(self, examples: List[Tuple[str, str]]) -> float:
+        """Share of (query, intent) pairs predicted correctly."""
+        if not examples:
+            return 0.0
+        X = self.vectorizer.transform([normalize_query(q) for q, _ in examples])
+        predicted = self.classifier.predict(X)
+        return sum(p == intent for p, (_, intent) in zip(predicted, examples)) / len(examples)
+
+    def validated(self) -> bool:
+        """Whether the model passed the held-out check when it was saved."""
+        return self.holdout_accuracy is not None and self.holdout_accuracy >= MIN_ACCURACY
+
+    def as_intent_classifier(self, **kwargs) -> IntentClassifier:
+        """Wrap this model so it can be used anywhere an IntentClassifier is expected."""
+        return IntentClassifier(self.vectorizer, self.classifier, **kwargs)
+
+    def save(self, path: str = ONLINE_MODEL_PATH) -> None:
+        import joblib
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str = ONLINE_MODEL_PATH) -> 'OnlineIntentModel':
+        import joblib
+        model = joblib.load(path)
+        # Models saved before these fields existed
+        model.__dict__.setdefault('holdout_accuracy', None)
+        model.__dict__.setdefault('applied_log', set())
+        return model
+
+
+def iter_batches(examples: Iterable[Tuple[str, str]], batch_size: int) -> Iterator[Tuple[List[str], List[str]]]:
+    queries, intents = [], []
+    for query, intent in examples:
+        queries.append(query)
+        intents.append(intent)
+        if len(queries) >= batch_size:
+            yield queries, intents
+            queries, intents = [], []
+    if queries:
+        yield queries, intents
+
+
+def is_holdout(query: str) -> bool:
+    """Stable held-out split by query hash, the same on every run."""
+    digest = hashlib.blake2b(query.lower().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % 1000 < HOLDOUT_FRACTION * 1000
+
+
+def read_training_csv(path: str) -> Iterator[Tuple[str, str]]:
+    """Yield (query, intent) rows from a CSV with 'query' and 'intent' columns."""
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            yield row['query'], row['intent']
+
+
+def log_entry_key(entry: dict) -> str:
+    """Identifies a query log entry; labels are filled in place, so the line offset can't."""
+    return f"{entry.get('timestamp')}\t{entry.get('query')}"
+
+
+def read_labeled_log(path: str = QUERY_LOG_PATH,
+                     classes: Optional[List[str]] = None) -> Iterator[Tuple[str, str, str]]:
+    """
+    Yield (entry key, query, label) from the query log, skipping entries that
+    have not been labeled yet or carry an unknown label.
+    """
+    classes = set(classes or INTENTS)
+    if not os.path.exists(path):
+        return
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            label = entry.get('label')
+            if label in classes and entry.get('query'):
+                yield log_entry_key(entry), entry['query'], label
+
+
+def log_query(query: str, predicted: Optional[str], confidence: float, path: str = QUERY_LOG_PATH) -> None:
+    """Append a query to the log so it can be labeled and fed to partial_fit later."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    entry = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'query': query,
+        'predicted': predicted,
+        'confidence': round(float(confidence), 4),
+        'label': None,
+    }
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + '\n')
@@ -1,37 +1,86 @@
 import os
 import sys
+import threading
+from collections import OrderedDict
 from datetime import date, timedelta
 from typing import Optional, Tuple, List, Dict
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from src.chatbot.entity_extractor import resolve_time_range
-from src.data.cache import fetch_metrics, get_latest_metrics
+from src.data.bootstrap import bootstrap, syncing_note
+from src.data.cache import add_ingest_listener, data_version, fetch_metrics, get_latest_metrics
+from src.data.metrics import format_value
 
 
-def format_value(metric: str, value: Optional[float]) -> str:
-    """Format a metric value with appropriate units or rounding."""
-    if value is None:
-        return "No data available"
-
-    # Add units or formatting based on metric type
-    if metric in ['sleep_efficiency']:
-        return f"{value:.1f}%"
-    elif metric in ['avg_temperature']:
-        return f"{value:.1f}°C"
-    elif metric in ['total_steps']:
-        return f"{int(value)}"
-    elif metric in ['total_sleep_min', 'deep_sleep_min', 'rem_sleep_min', 'light_sleep_min', 'active_minutes']:
-        # Convert minutes to hours and minutes for better readability
-        hours = int(value) // 60
-        minutes = int(value) % 60
-        if hours > 0:
-            return f"{hours}h {minutes}m"
-        else:
-            return f"{minutes}m"
-    elif metric in ['hrv_avg', 'rhr_avg', 'vo2_max', 'recovery_score', 'movement_score', 'sleep_score']:
-        return f"{int(value)}"
-    else:
-        return f"{value:.2f}"
+class ResponseCache:
+    """
+    Bounded LRU memo of generated answers. Each entry remembers the store's
+    data version it was computed at and is only served while that version is
+    current, so writes from any process (ingest, reparse) are never missed.
+    Ingest in this process also drops entries whose date range it touches
+    right away.
+    """
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        # key -> (start, end, data version, answer)
+        self._entries: "OrderedDict[tuple, Tuple[str, str, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: tuple, version: int) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] != version:
+                # Computed before the store last changed
+                del self._entries[key]
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def put(self, key: tuple, start: date, end: date, answer: str, version: int) -> None:
+        """version must be read before the data the answer was built from."""
+        with self._lock:
+            self._entries[key] = (start.isoformat(), end.isoformat(), version, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_date(self, metric_date: date) -> None:
+        """Drop every entry whose date range contains metric_date."""
+        day = metric_date.isoformat()
+        with self._lock:
+            stale = [key for key, (start, end, _, _) in self._entries.items() if start <= day <= end]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache()
+add_ingest_listener(response_cache.invalidate_date)
 
 
 def get_current_response(metric: str, latest_row: Optional[Dict]) -> str:
@@ -108,19 +157,39 @@ def compare_response(metric: str, rows: List[Dict]) -> str:
                 f"to {latest_fmt} on {latest['date']} (a change of {diff_fmt}).")
 
 
-def generate_response(intent: str, metric: Optional[str], time_range_info: Optional[Tuple[str, Tuple[date, date]]]) -> str:
+def generate_response(intent: str, metric: Optional[str], time_range_info: Optional[Tuple[str, Tuple[date, date]]],
+                      today: Optional[date] = None) -> str:
     """
     Main entry point: generate a response based on intent and extracted entities.
+    Answers are memoized in response_cache until the stored data changes.
+    today fixes relative ranges like "last week" (default: the real date).
     """
-    today = date.today()
+    today = today or date.today()
+    # Read before the data so a write landing in between leaves the entry stale, not wrong
+    version = data_version()
 
     # Resolve date range based on intent and time_range_info
     if intent == 'get_current':
+        key = (intent, metric, 'latest')
+        cached = response_cache.get(key, version)
+        if cached is not None:
+            return cached
+        # Check before reading: a day finishing in between is then counted as syncing, never missed
+        pending = bootstrap.syncing()
         # For current, we want the latest data (today or most recent)
         latest_row = get_latest_metrics()
         if latest_row:
             row_dict = dict(latest_row)
-            return get_current_response(metric, row_dict)
+            answer = get_current_response(metric, row_dict)
+            newer = [day for day in pending if day > date.fromisoformat(row_dict['date'])]
+            if newer:
+                # Not cached: a day that fails to fetch never triggers invalidation
+                return f"{answer}\n\n{syncing_note(newer)}"
+            # Any data for the latest date or newer changes the answer
+            response_cache.put(key, date.fromisoformat(row_dict['date']), date.max, answer, version)
+            return answer
+        elif pending:
+            return "Your data is still syncing. Ask again in a moment."
         else:
             return "I don't have any data yet. Please fetch some historical data first."
     elif intent in ['get_history', 'compare']:
@@ -136,17 +205,29 @@ def generate_response(intent: str, metric: Optional[str], time_range_info: Optio
                 end = today - timedelta(days=1)
                 start = end - timedelta(days=6)
 
+        key = (intent, metric, start, end)
+        cached = response_cache.get(key, version)
+        if cached is not None:
+            return cached
+
+        pending = bootstrap.syncing(start, end)
         # Fetch data from cache for the range
         rows = fetch_metrics(start, end)
         if not rows:
-            return f"No data available from {start} to {end}."
-
-        # Convert rows to list of dicts
-        rows_dict = [dict(row) for row in rows]
-
-        if intent == 'get_history':
-            return get_history_response(metric, start, end, rows_dict)
+            if pending:
+                return f"Data from {start} to {end} is still syncing. Ask again in a moment."
+            answer = f"No data available from {start} to {end}."
         else:
-            return compare_response(metric, rows_dict)
+            # Convert rows to list of dicts
+            rows_dict = [dict(row) for row in rows]
+
+            if intent == 'get_history':
+                answer = get_history_response(metric, start, end, rows_dict)
+            else:
+                answer = compare_response(metric, rows_dict)
+        if pending:
+            return f"{answer}\n\n{syncing_note(pending)}"
+        response_cache.put(key, start, end, answer, version)
+        return answer
     else:
         return "I'm not sure how to answer that."
\ No newline at end of file
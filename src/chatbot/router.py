@@ -0,0 +1,148 @@
+"""
+Cheap nearest-neighbour router that keeps paraphrased data questions off the LLM.
+Queries are embedded as hashed character n-grams and compared by cosine
+similarity against the training corpus and previously answered queries.
+"""
+
+import csv
+import os
+import sys
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot.intent_classifier import normalize_query
+
+# Intents that generate_response can answer straight from the store
+DATA_INTENTS = ('get_current', 'get_history', 'compare')
+
+ROUTER_INDEX_PATH = os.path.join('models', 'router_index.npz')
+
+
+def embed(normalized: str, dim: int, ngram_range: Tuple[int, int] = (3, 5)) -> np.ndarray:
+    """L2-normalized hashed character n-gram vector for normalized query text."""
+    text = f" {normalized} "
+    buckets = []
+    for n in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(text) - n + 1):
+            # crc32 rather than hash(): stable across processes, so the index can be cached
+            buckets.append(zlib.crc32(text[i:i + n].encode('utf-8')) & (dim - 1))
+    vec = np.bincount(buckets, minlength=dim).astype(np.float32) if buckets else np.zeros(dim, np.float32)
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec
+
+
+class NeighbourRouter:
+    def __init__(self, dim: int = 1024, k: int = 5, min_similarity: float = 0.65, min_share: float = 0.6):
+        if dim & (dim - 1):
+            raise ValueError("dim must be a power of two")
+        self.dim = dim
+        self.k = k
+        self.min_similarity = min_similarity
+        self.min_share = min_share
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._intents: List[str] = []
+        self.routed = 0
+        self.escalated = 0
+
+    def __len__(self):
+        return self._size
+
+    def add_many(self, queries: List[str], intents: List[str]) -> None:
+        """Add labeled queries to the index."""
+        if not queries:
+            return
+        vectors = np.stack([embed(normalize_query(q), self.dim) for q in queries])
+        self._append(vectors, intents)
+
+    def add(self, query: str, intent: str) -> None:
+        """Remember an answered query so future paraphrases route to the same intent."""
+        self._append(embed(normalize_query(query), self.dim)[None, :], [intent])
+
+    def _append(self, vectors: np.ndarray, intents: List[str]) -> None:
+        needed = self._size + len(vectors)
+        if needed > len(self._vectors):
+            # Grow geometrically so repeated add() calls stay amortized O(1)
+            capacity = max(needed, 2 * len(self._vectors), 64)
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._vectors[self._size:needed] = vectors
+        self._intents.extend(intents)
+        self._size = needed
+
+    def nearest(self, query: str) -> List[Tuple[str, float]]:
+        """Top-k (intent, cosine similarity) neighbours, best first."""
+        if not self._size:
+            return []
+        scores = self._vectors[:self._size] @ embed(normalize_query(query), self.dim)
+        k = min(self.k, self._size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._intents[i], float(scores[i])) for i in top]
+
+    def route(self, query: str) -> Tuple[Optional[str], float]:
+        """
+        Return (data_intent, similarity) when the query is a close paraphrase of
+        a known data question, else (None, best_similarity) to escalate to the LLM.
+        Any close advice (or irrelevant) neighbour escalates: "tips to raise my
+        recovery score" shares most n-grams with "my recovery score".
+        """
+        neighbours = [(intent, score) for intent, score in self.nearest(query) if score >= self.min_similarity]
+        best = neighbours[0][1] if neighbours else 0.0
+        if neighbours and all(intent in DATA_INTENTS for intent, _ in neighbours):
+            votes: Dict[str, float] = {}
+            for intent, score in neighbours:
+                votes[intent] = votes.get(intent, 0.0) + score
+            winner = max(votes, key=votes.get)
+            if winner in DATA_INTENTS and votes[winner] / sum(votes.values()) >= self.min_share:
+                self.routed += 1
+                return winner, best
+        self.escalated += 1
+        return None, best
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'index_size': self._size,
+            'routed': self.routed,
+            'escalated': self.escalated,
+            'llm_calls_avoided': self.routed,
+        }
+
+    def save(self, path: str = ROUTER_INDEX_PATH, source_stamp: str = '') -> None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Written aside and renamed, so a concurrent from_corpus never loads a partial index
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(f, vectors=self._vectors[:self._size],
+                                intents=np.array(self._intents), stamp=np.array(source_stamp))
+        os.replace(tmp, path)
+
+    @classmethod
+    def from_corpus(cls, csv_path: str, cache_path: str = ROUTER_INDEX_PATH, **kwargs) -> 'NeighbourRouter':
+        """
+        Build the index from a query/intent CSV, reusing the cached index at
+        cache_path while the CSV is unchanged.
+        """
+        router = cls(**kwargs)
+        if not os.path.exists(csv_path):
+            return router
+        st = os.stat(csv_path)
+        stamp = f"{st.st_size}:{int(st.st_mtime)}:{router.dim}"
+
+        if os.path.exists(cache_path):
+            cached = np.load(cache_path)
+            if str(cached['stamp']) == stamp:
+                router._append(cached['vectors'], [str(i) for i in cached['intents']])
+                return router
+
+        with open(csv_path, newline='', encoding='utf-8') as f:
+            rows = [(row['query'], row['intent']) for row in csv.DictReader(f)]
+        router.add_many([q for q, _ in rows], [i for _, i in rows])
+        router.save(cache_path, stamp)
+        return router
@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+"""
+HTTP/JSON server mode for AI Health Coach.
+Loads the intent classifier, router and LLM client once and serves many chat
+sessions concurrently on one asyncio event loop. Classification and SQLite
+work run in a thread pool so a slow query never stalls other sessions; LLM
+calls go through the shared AsyncOllamaClient queue.
+
+Endpoints:
+  POST   /sessions                -> {"session_id": ...}
+  POST   /chat                    {"session_id"?, "message", "stream"?}
+  GET    /sessions/<id>/history   -> {"history": [[role, message], ...]}
+  DELETE /sessions/<id>
+  GET    /health
+  GET    /stats                   -> latency per stage (p50/p95/p99) and cache stats
+
+COACH_PROFILE_TURNS=N profiles the first N turns with cProfile and
+tracemalloc and writes the reports to data/profiles.
+
+Sessions are persisted; a stored session_id passed to /chat or /history is resumed.
+
+With "stream": true, /chat answers with newline-delimited JSON events:
+{"event": "start", ...}, {"event": "chunk", "text": ...}, {"event": "done", ...}.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from threading import Lock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.chatbot.async_llm_client import AsyncOllamaClient, QueueFullError
+from src.chatbot.cli_chat import (
+    LLM_STATIC_CONTEXT, advice_request, ai_request, history_store, llm_cache, load_classifier, route_query,
+)
+from src.chatbot.intent_classifier import normalize_query
+from src.chatbot.llm_client import PromptBuilder, StreamError
+from src.chatbot.response_generator import generate_response, response_cache
+from src.chatbot.router import NeighbourRouter
+from src.data.bootstrap import bootstrap
+from src.data.cache import init_db
+from src.data.llm_cache import make_key
+from src.perf.profiler import PROFILE_ENV, profiler
+from src.perf.spans import new_turn, recorder
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamAborted(Exception):
+    """A streamed response ended early with an error event; the connection must be closed."""
+
+
+class ChatSession:
+    def __init__(self, history):
+        self.session_id = history.session_id
+        # Ring buffer of recent messages, written through to SQLite
+        self.history = history
+        # Each session keeps its own prompt window so prefixes stay stable per conversation
+        self.prompt = PromptBuilder(static_context=LLM_STATIC_CONTEXT)
+        # Turns within one session are answered in order
+        self.lock = asyncio.Lock()
+        self.last_active = time.monotonic()
+
+
+class LockedRouter:
+    """
+    NeighbourRouter behind a lock. Its index and counters aren't thread-safe,
+    but the classification and entity extraction around it are, so only the
+    router calls are serialized.
+    """
+
+    def __init__(self, router):
+        self.router = router
+        self._lock = Lock()
+
+    def route(self, query):
+        with self._lock:
+            return self.router.route(query)
+
+    def add(self, query, intent):
+        with self._lock:
+            self.router.add(query, intent)
+
+    def stats(self):
+        with self._lock:
+            return self.router.stats()
+
+
+class CoachService:
+    def __init__(self, llm_client, intent_model, router, workers=8, session_ttl=3600, max_sessions=10000):
+        self.llm = llm_client
+        self.intent_model = intent_model
+        # Routing runs in the pool
+        self.router = LockedRouter(router)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='coach')
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+
+    async def _blocking(self, fn, *args):
+        # Run in a copy of this context so spans in the thread keep the turn id
+        # and go through the profiler, which only does work while profiling is on
+        call = contextvars.copy_context().run
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call, profiler.call, fn, *args)
+
+    def _check_capacity(self):
+        self._expire_sessions()
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "too many sessions")
+
+    def new_session(self):
+        self._check_capacity()
+        session = ChatSession(history_store.new_session())
+        self.sessions[session.session_id] = session
+        return session
+
+    async def get_session(self, session_id):
+        """A live session, or a stored one resumed from the history store."""
+        session = self.sessions.get(session_id)
+        if session is None:
+            history = await self._blocking(history_store.open, session_id)
+            if history is None:
+                raise HTTPError(HTTPStatus.NOT_FOUND, f"unknown session {session_id}")
+            # Another request may have resumed it while we were reading
+            session = self.sessions.get(session_id)
+            if session is None:
+                # Resumed sessions count against max_sessions like new ones
+                self._check_capacity()
+                session = self.sessions[session_id] = ChatSession(history)
+        return session
+
+    def _expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id in [s.session_id for s in self.sessions.values() if s.last_active < cutoff]:
+            del self.sessions[session_id]
+
+    def _route(self, query):
+        return route_query(query, self.intent_model, self.router)
+
+    def _answer_from_store(self, query, intent, parsed, routed):
+        response = generate_response(intent, parsed.metric, parsed.time_info)
+        # Only confident classifications teach the router; a routed guess would reinforce itself
+        if not routed:
+            self.router.add(query, intent)
+        return response
+
+    async def turn(self, session, query):
+        """
+        Answer one message. Yields ("start", info), then ("chunk", text) events
+        as the answer arrives, then ("done", full_text).
+        """
+        session.last_active = time.monotonic()
+        async with session.lock:
+            new_turn()
+            if query.lower().startswith('@ai'):
+                clean_query = query[3:].strip()
+                if not clean_query:
+                    raise HTTPError(HTTPStatus.BAD_REQUEST, "ask a question after @ai")
+                yield "start", {"path": "ai", "intent": None}
+                request = await self._blocking(ai_request, clean_query, session.history)
+                chunks = self._llm_chunks(session, clean_query, request, max_tokens=300)
+            else:
+                parsed, intent, similarity = await self._blocking(self._route, query)
+                info = {"intent": intent, "confidence": parsed.confidence, "routed": bool(similarity)}
+                if intent is not None and intent != 'advice':
+                    yield "start", dict(info, path="data")
+                    chunks = None
+                    response = await self._blocking(self._answer_from_store, query, intent, parsed, info["routed"])
+                    yield "chunk", response
+                else:
+                    yield "start", dict(info, path="advice")
+                    request = await self._blocking(advice_request, query, parsed.metric,
+                                                   parsed.time_info, session.history)
+                    chunks = self._llm_chunks(session, query, request, max_tokens=500)
+
+            if chunks is not None:
+                response = ""
+                async for chunk in chunks:
+                    response += chunk
+                    yield "chunk", chunk
+                response = response.strip()
+            await self._blocking(session.history.add_turn, query, response)
+            reports = profiler.turn_done()
+            if reports:
+                print(f"Turn profile written to {reports[0]} and {reports[1]}", flush=True)
+            yield "done", response
+
+    async def _llm_chunks(self, session, cache_query, request, max_tokens):
+        """Stream from the LLM cache or the shared client, storing complete answers."""
+        prompt, recent, context, summary = request
+        key = make_key(normalize_query(cache_query), self.llm.model, summary)
+        cached = await self._blocking(llm_cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+        text = ""
+        failed = False
+        async for chunk in self.llm.generate_stream(prompt, session.prompt, recent, context, max_tokens):
+            # The error can follow partial text, so the prefix check alone misses it
+            failed = failed or isinstance(chunk, StreamError)
+            text += chunk
+            yield chunk
+        text = text.strip()
+        if text and not failed:
+            await self._blocking(llm_cache.put, key, self.llm.model, cache_query, text)
+
+    def health(self):
+        return {
+            "status": "ok",
+            "sessions": len(self.sessions),
+            "llm_queue": self.llm.queue_size(),
+            "router": self.router.stats(),
+            "data_sync": bootstrap.status(),
+        }
+
+    def stats(self):
+        return {
+            "stages": recorder.stats(),
+            "response_cache": response_cache.stats(),
+            "llm_cache": llm_cache.stats(),
+            "router": self.router.stats(),
+        }
+
+
+async def read_request(reader):
+    """Parse one HTTP/1.1 request; returns (method, path, headers, body) or None at EOF."""
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    parts = request_line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "malformed request line")
+    method, path, _ = parts
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1').strip()
+        if not line:
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body too large")
+    body = await reader.readexactly(length) if length else b''
+    return method, path.split('?', 1)[0], headers, body
+
+
+def _head(status, headers):
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"] + [f"{k}: {v}" for k, v in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+
+async def send_json(writer, obj, status=HTTPStatus.OK):
+    body = json.dumps(obj).encode('utf-8')
+    writer.write(_head(status, {'Content-Type': 'application/json', 'Content-Length': len(body)}) + body)
+    await writer.drain()
+
+
+def _chunk(obj):
+    line = (json.dumps(obj) + "\n").encode('utf-8')
+    return f"{len(line):x}\r\n".encode('ascii') + line + b"\r\n"
+
+
+async def send_stream(writer, events):
+    """
+    Send (event, data) pairs as chunked NDJSON. Errors after the headers become
+    an error event that ends the body; unexpected ones then raise StreamAborted.
+    """
+    writer.write(_head(HTTPStatus.OK, {'Content-Type': 'application/x-ndjson', 'Transfer-Encoding': 'chunked'}))
+    try:
+        async for event, data in events:
+            if event == "start":
+                obj = dict(data, event=event)
+            elif event == "chunk":
+                obj = {"event": event, "text": data}
+            else:
+                obj = {"event": event, "response": data}
+            writer.write(_chunk(obj))
+            # Back-pressure: a slow client holds only its own turn
+            await writer.drain()
+    except (HTTPError, QueueFullError) as e:
+        writer.write(_chunk({"event": "error", "error": str(e)}))
+    except (ConnectionError, asyncio.IncompleteReadError):
+        raise
+    except Exception:
+        # The 200 headers are out, so a JSON 500 would corrupt the body
+        logger.exception("error while streaming a response")
+        writer.write(_chunk({"event": "error", "error": "internal error"}) + b"0\r\n\r\n")
+        await writer.drain()
+        raise StreamAborted()
+    writer.write(b"0\r\n\r\n")
+    await writer.drain()
+
+
+class CoachServer:
+    def __init__(self, service):
+        self.service = service
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                headers = {}
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    await self.dispatch(writer, method, path, body)
+                except HTTPError as e:
+                    await send_json(writer, {"error": str(e)}, e.status)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except StreamAborted:
+                    # Already answered with an error event
+                    break
+                except Exception:
+                    # Only reached before a response has started: send_json writes
+                    # in one go and send_stream handles its own errors
+                    logger.exception("error handling request")
+                    await send_json(writer, {"error": "internal error"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+                    break
+                if headers.get('connection', '').lower() == 'close':
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, writer, method, path, body):
+        service = self.service
+        segments = [s for s in path.split('/') if s]
+        if method == 'GET' and segments == ['health']:
+            await send_json(writer, service.health())
+        elif method == 'GET' and segments == ['stats']:
+            await send_json(writer, await service._blocking(service.stats))
+        elif method == 'POST' and segments == ['sessions']:
+            await send_json(writer, {"session_id": service.new_session().session_id}, HTTPStatus.CREATED)
+        elif method == 'GET' and len(segments) == 3 and segments[0] == 'sessions' and segments[2] == 'history':
+            session = await service.get_session(segments[1])
+            await send_json(writer, {"history": list(session.history)})
+        elif method == 'DELETE' and len(segments) == 2 and segments[0] == 'sessions':
+            # Ends the live session; its stored history can still be resumed
+            service.sessions.pop(segments[1], None)
+            await send_json(writer, {"deleted": segments[1]})
+        elif method == 'POST' and segments == ['chat']:
+            await self.chat(writer, body)
+        else:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no route for {method} {path}")
+
+    async def chat(self, writer, body):
+        try:
+            request = json.loads(body or b'{}')
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        message = (request.get('message') or '').strip()
+        if not message:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "'message' is required")
+        session_id = request.get('session_id')
+        session = await self.service.get_session(session_id) if session_id else self.service.new_session()
+
+        events = self._with_session_id(session, self.service.turn(session, message))
+        try:
+            if request.get('stream'):
+                await send_stream(writer, events)
+                return
+            result = {}
+            async for event, data in events:
+                if event == "start":
+                    result.update(data)
+                elif event == "done":
+                    result["response"] = data
+            await send_json(writer, result)
+        except QueueFullError as e:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, str(e))
+
+    @staticmethod
+    async def _with_session_id(session, events):
+        async for event, data in events:
+            if event == "start":
+                data = dict(data, session_id=session.session_id)
+            yield event, data
+
+
+async def serve(host='127.0.0.1', port=8080, ollama_url="http://localhost:11434", concurrency=2, workers=8):
+    init_db()
+    if os.environ.get(PROFILE_ENV):
+        # Profile the first N turns served, then write the reports to data/profiles
+        profiler.on(int(os.environ[PROFILE_ENV]))
+    intent_model = load_classifier()
+    router = NeighbourRouter.from_corpus(os.path.join('data', 'intent_training.csv'))
+    async with AsyncOllamaClient(base_url=ollama_url, concurrency=concurrency) as llm_client:
+        service = CoachService(llm_client, intent_model, router, workers=workers)
+        server = await asyncio.start_server(CoachServer(service).handle_connection, host, port)
+        logger.info("Serving on http://%s:%s", host, port)
+        print(f"AI Health Coach API listening on http://{host}:{port}")
+        serving = asyncio.current_task()
+        loop = asyncio.get_running_loop()
+        with contextlib.suppress(NotImplementedError):
+            # Shut down cleanly on SIGTERM so pending history is written
+            loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+        flusher = asyncio.create_task(_flush_history(service, history_store.flush_interval))
+        try:
+            async with server:
+                await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            flusher.cancel()
+            history_store.flush()
+
+
+async def _flush_history(service, interval):
+    """Write batched history of quiet sessions, which never fill a batch on their own."""
+    while True:
+        await asyncio.sleep(interval)
+        await service._blocking(history_store.flush)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve AI Health Coach over HTTP/JSON")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--ollama-url', default="http://localhost:11434")
+    parser.add_argument('--llm-concurrency', type=int, default=2, help='LLM requests in flight at once')
+    parser.add_argument('--workers', type=int, default=8, help='threads for classification and SQLite work')
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.ollama_url, args.llm_concurrency, args.workers))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,62 +3,8 @@
 Templates and synonyms for generating training data.
 """
 
-METRIC_SYNONYMS = {
-    'recovery_score': [
-        'recovery', 'recovery score', 'recovery index',
-        'recovery level', 'readiness', 'recovery rating'
-    ],
-    'movement_score': [
-        'movement', 'movement score', 'movement index',
-        'activity score', 'daily movement'
-    ],
-    'sleep_score': [
-        'sleep', 'sleep score', 'sleep quality',
-        'sleep rating', 'sleep performance'
-    ],
-    'total_sleep_min': [
-        'total sleep', 'sleep time', 'sleep duration',
-        'hours slept', 'sleep length', 'time asleep'
-    ],
-    'sleep_efficiency': [
-        'sleep efficiency', 'efficiency',
-        'sleep quality percentage'
-    ],
-    'deep_sleep_min': [
-        'deep sleep', 'deep sleep minutes',
-        'deep sleep duration'
-    ],
-    'rem_sleep_min': [
-        'rem sleep', 'rem', 'rem duration'
-    ],
-    'light_sleep_min': [
-        'light sleep', 'light sleep minutes'
-    ],
-    'avg_temperature': [
-        'temperature', 'skin temperature',
-        'body temperature', 'avg temp'
-    ],
-    'total_steps': [
-        'steps', 'step count', 'steps taken',
-        'daily steps', 'how many steps'
-    ],
-    'hrv_avg': [
-        'hrv', 'heart rate variability',
-        'hrv average'
-    ],
-    'rhr_avg': [
-        'resting heart rate', 'rhr',
-        'resting hr', 'night rhr'
-    ],
-    'active_minutes': [
-        'active minutes', 'activity minutes',
-        'active time', 'exercise time'
-    ],
-    'vo2_max': [
-        'vo2 max', 'vo2',
-        'cardio fitness', 'fitness level'
-    ],
-}
+# Training phrases for each metric live in the metric registry
+from src.data.metrics import METRIC_SYNONYMS
 
 TIME_RANGES = [
     'last 3 days',
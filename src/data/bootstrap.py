@@ -0,0 +1,135 @@
+"""
+First-run data bootstrap: fetch recent days in the background so the chat
+can start at once. The most recent day is fetched first on its own, then the
+rest concurrently, with API requests still started at most one per
+MIN_REQUEST_INTERVAL seconds across all threads. Answers check which dates are still in flight so they can
+say "still syncing" instead of "no data".
+"""
+
+import queue
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+from src.api.client import get_email, get_token
+from src.data.cache import date_exists
+from src.data.fetcher import fetch_and_store_day
+
+# Same spacing the sequential fetch_recent_days keeps between API calls
+MIN_REQUEST_INTERVAL = 0.5
+
+
+def _as_date(value) -> date:
+    # Time ranges may come back as datetimes, which don't compare with dates
+    return value.date() if isinstance(value, datetime) else value
+
+
+class DataBootstrap:
+    def __init__(self, workers: int = 3, min_interval: float = MIN_REQUEST_INTERVAL):
+        # Concurrent fetches once the most recent day is in
+        self.workers = workers
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._throttle_lock = threading.Lock()
+        self._next_request = 0.0
+        self._pending = set()
+        self._loaded = set()
+        self._failed = set()
+        self._done = threading.Event()
+        self._done.set()
+
+    def start(self, days: int = 7, today: Optional[date] = None) -> None:
+        """
+        Fetch the last `days` days (excluding today) in daemon threads and
+        return immediately. Raises ValueError at once if no API token is set.
+        """
+        token = get_token()
+        email = get_email()
+        today = today or date.today()
+        dates = [today - timedelta(days=i) for i in range(1, days + 1)]
+        with self._lock:
+            self._pending.update(dates)
+        self._done.clear()
+        threading.Thread(target=self._run, args=(dates, token, email),
+                         name='data-bootstrap', daemon=True).start()
+
+    def _run(self, dates, token, email):
+        try:
+            # The latest day answers "how am I doing" questions; get it before anything else
+            self._fetch(dates[0], token, email)
+            rest = queue.Queue()
+            for day in dates[1:]:
+                rest.put(day)
+            threads = [
+                threading.Thread(target=self._drain, args=(rest, token, email),
+                                 name=f'data-bootstrap-{i}', daemon=True)
+                for i in range(min(self.workers, len(dates) - 1))
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self._done.set()
+
+    def _drain(self, days, token, email):
+        while True:
+            try:
+                day = days.get_nowait()
+            except queue.Empty:
+                return
+            self._fetch(day, token, email)
+
+    def _throttle(self):
+        # Held while sleeping, so waiting threads leave one at a time, min_interval apart
+        with self._throttle_lock:
+            wait = self._next_request - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self._next_request = time.monotonic() + self.min_interval
+
+    def _fetch(self, day, token, email):
+        # Days already stored make no API call, so don't spend the rate limit on them
+        if not date_exists(day):
+            self._throttle()
+        ok = fetch_and_store_day(day, token, email)
+        # Only leave pending once the row is stored, so readers never see a gap
+        with self._lock:
+            self._pending.discard(day)
+            (self._loaded if ok else self._failed).add(day)
+
+    def syncing(self, start: date = date.min, end: date = date.max) -> List[date]:
+        """Dates between start and end (inclusive) that are still being fetched."""
+        start, end = _as_date(start), _as_date(end)
+        with self._lock:
+            return sorted(day for day in self._pending if start <= day <= end)
+
+    def failed(self, start: date = date.min, end: date = date.max) -> List[date]:
+        start, end = _as_date(start), _as_date(end)
+        with self._lock:
+            return sorted(day for day in self._failed if start <= day <= end)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the current bootstrap finishes; False on timeout."""
+        return self._done.wait(timeout)
+
+    def status(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'loaded': len(self._loaded),
+                'failed': len(self._failed),
+            }
+
+
+# Shared by main.ensure_data and the code that answers queries
+bootstrap = DataBootstrap()
+
+
+def syncing_note(pending: List[date]) -> str:
+    """One-line notice for answers that don't include dates still being fetched."""
+    if len(pending) == 1:
+        return f"Data for {pending[0]} is still syncing, so this may change in a moment."
+    return (f"Data for {len(pending)} days ({pending[0]} to {pending[-1]}) is still syncing, "
+            f"so this may change in a moment.")
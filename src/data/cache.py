@@ -2,10 +2,23 @@ import os
 import json
 import sqlite3
 from datetime import date
-from typing import Optional, List, Dict
+from typing import Callable, Optional, List, Dict
+
+from src.data.metrics import CREATE_TABLE_SQL, INSERT_SQL, insert_row, missing_columns_sql
+from src.perf.spans import timed
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'ultrahuman.db')
 
+# One-row change counter, bumped in the same transaction as every write to
+# daily_metrics so readers in any process can tell their copy is stale
+DATA_VERSION_SQL = (
+    'CREATE TABLE IF NOT EXISTS data_version (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)',
+    'INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)',
+)
+
+# Callbacks run after metrics for a date are stored: callback(metric_date)
+_ingest_listeners: List[Callable[[date], None]] = []
+
 
 def get_db_connection():
     """Return a connection to the SQLite database."""
@@ -17,49 +30,39 @@ def get_db_connection():
 
 
 def init_db():
-    """Create the daily_metrics table if it doesn't exist."""
+    """Create the daily_metrics table if it doesn't exist, adding columns for any new metrics."""
+    with get_db_connection() as conn:
+        conn.execute(CREATE_TABLE_SQL)
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(daily_metrics)')]
+        for statement in missing_columns_sql(columns):
+            conn.execute(statement)
+        create_data_version(conn)
+
+
+def create_data_version(conn: sqlite3.Connection) -> None:
+    """Create the data_version counter if the store doesn't have one yet."""
+    for statement in DATA_VERSION_SQL:
+        conn.execute(statement)
+
+
+def bump_data_version(conn: sqlite3.Connection) -> None:
+    """Mark daily_metrics as changed; call inside the writing transaction."""
+    conn.execute('UPDATE data_version SET version = version + 1 WHERE id = 1')
+
+
+@timed('sqlite.data_version')
+def data_version() -> int:
+    """Current change counter of daily_metrics; any write by any process raises it."""
     with get_db_connection() as conn:
-        conn.execute('''
-                     CREATE TABLE IF NOT EXISTS daily_metrics
-                     (
-                         date
-                         TEXT
-                         PRIMARY
-                         KEY,
-                         recovery_score
-                         REAL,
-                         movement_score
-                         REAL,
-                         sleep_score
-                         REAL,
-                         total_sleep_min
-                         REAL,
-                         sleep_efficiency
-                         REAL,
-                         deep_sleep_min
-                         REAL,
-                         rem_sleep_min
-                         REAL,
-                         light_sleep_min
-                         REAL,
-                         avg_temperature
-                         REAL,
-                         total_steps
-                         REAL,
-                         hrv_avg
-                         REAL,
-                         rhr_avg
-                         REAL,
-                         active_minutes
-                         REAL,
-                         vo2_max
-                         REAL,
-                         raw_json
-                         TEXT
-                     )
-                     ''')
+        try:
+            return conn.execute('SELECT version FROM data_version WHERE id = 1').fetchone()[0]
+        except sqlite3.OperationalError:
+            # A store from before the counter that init_db hasn't migrated yet
+            create_data_version(conn)
+            return 0
 
 
+@timed('sqlite.insert_metrics')
 def insert_metrics(
         metric_date: date,
         metrics: Dict[str, Optional[float]],
@@ -72,34 +75,22 @@ def insert_metrics(
     raw_json_str = json.dumps(raw_json) if raw_json else None
 
     with get_db_connection() as conn:
-        conn.execute('''
-            INSERT OR REPLACE INTO daily_metrics (
-                date, recovery_score, movement_score, sleep_score,
-                total_sleep_min, sleep_efficiency, deep_sleep_min,
-                rem_sleep_min, light_sleep_min, avg_temperature,
-                total_steps, hrv_avg, rhr_avg, active_minutes,
-                vo2_max, raw_json
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            date_str,
-            metrics.get('recovery_score'),
-            metrics.get('movement_score'),
-            metrics.get('sleep_score'),
-            metrics.get('total_sleep_min'),
-            metrics.get('sleep_efficiency'),
-            metrics.get('deep_sleep_min'),
-            metrics.get('rem_sleep_min'),
-            metrics.get('light_sleep_min'),
-            metrics.get('avg_temperature'),
-            metrics.get('total_steps'),
-            metrics.get('hrv_avg'),
-            metrics.get('rhr_avg'),
-            metrics.get('active_minutes'),
-            metrics.get('vo2_max'),
-            raw_json_str
-        ))
+        conn.execute(INSERT_SQL, insert_row(date_str, metrics, raw_json_str))
+        bump_data_version(conn)
+    _notify_ingest(metric_date)
+
+
+def add_ingest_listener(callback: Callable[[date], None]) -> None:
+    """Register a callback to be told which date just received new data."""
+    _ingest_listeners.append(callback)
+
+
+def _notify_ingest(metric_date: date) -> None:
+    for callback in _ingest_listeners:
+        callback(metric_date)
 
 
+@timed('sqlite.fetch_metrics')
 def fetch_metrics(start_date: date, end_date: date) -> List[sqlite3.Row]:
     """
     Fetch all rows for dates between start_date and end_date inclusive,
@@ -117,6 +108,7 @@ def fetch_metrics(start_date: date, end_date: date) -> List[sqlite3.Row]:
         return cursor.fetchall()
 
 
+@timed('sqlite.get_latest_metrics')
 def get_latest_metrics() -> Optional[sqlite3.Row]:
     """Return the most recent row (by date)."""
     with get_db_connection() as conn:
@@ -129,6 +121,7 @@ def get_latest_metrics() -> Optional[sqlite3.Row]:
         return cursor.fetchone()
 
 
+@timed('sqlite.date_exists')
 def date_exists(metric_date: date) -> bool:
     """Check if data for a given date already exists."""
     date_str = metric_date.isoformat()
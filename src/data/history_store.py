@@ -0,0 +1,173 @@
+"""
+Chat session history: a bounded in-memory ring buffer per session, written
+through to SQLite in batches so conversations survive restarts and can be
+resumed.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from typing import List, Optional, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.data.cache import get_db_connection
+from src.perf.spans import timed
+
+# Messages kept in memory per session (one exchange is two messages)
+DEFAULT_MAX_MESSAGES = 100
+
+
+class SessionHistory:
+    """
+    (role, message) entries for one session. Appends are O(1) and the oldest
+    entries fall off once max_messages is reached. Without a store the
+    history is in-memory only.
+    """
+
+    def __init__(self, session_id: str, max_messages: int = DEFAULT_MAX_MESSAGES, store=None,
+                 entries=(), next_seq: int = 0):
+        self.session_id = session_id
+        self._buffer = deque(entries, maxlen=max_messages)
+        self._store = store
+        self._next_seq = next_seq
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def __iter__(self):
+        return iter(self._buffer)
+
+    def __bool__(self):
+        return bool(self._buffer)
+
+    def append(self, role: str, message: str) -> None:
+        self._buffer.append((role, message))
+        if self._store is not None:
+            self._store.write(self.session_id, self._next_seq, role, message)
+        self._next_seq += 1
+
+    def add_turn(self, query: str, response: str) -> None:
+        self.append("user", query)
+        self.append("assistant", response)
+
+    def recent(self, n: int) -> List[Tuple[str, str]]:
+        """The last n entries, oldest first; walks only those n entries."""
+        if n >= len(self._buffer):
+            return list(self._buffer)
+        tail = list(itertools.islice(reversed(self._buffer), n))
+        tail.reverse()
+        return tail
+
+    def clear(self) -> None:
+        """Forget the in-memory window; stored messages are kept."""
+        self._buffer.clear()
+
+
+class HistoryStore:
+    def __init__(self, batch_size: int = 8, flush_interval: float = 5.0,
+                 max_messages: int = DEFAULT_MAX_MESSAGES):
+        # Pending messages are written once there are batch_size of them or the
+        # oldest has waited flush_interval seconds, and always on flush()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_messages = max_messages
+        self._pending = []
+        self._oldest_pending = None
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _init_tables(self, conn):
+        if self._initialized:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                session_id TEXT,
+                seq INTEGER,
+                role TEXT,
+                message TEXT,
+                created_at REAL,
+                PRIMARY KEY (session_id, seq)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                created_at REAL,
+                last_active REAL
+            )
+        ''')
+        self._initialized = True
+
+    def new_session(self, session_id: Optional[str] = None) -> SessionHistory:
+        """Start a session; nothing is written until its first message."""
+        return SessionHistory(session_id or uuid.uuid4().hex, self.max_messages, store=self)
+
+    @timed('sqlite.history_open')
+    def open(self, session_id: str) -> Optional[SessionHistory]:
+        """Resume a stored session with its most recent messages, or None if unknown."""
+        self.flush()
+        with get_db_connection() as conn:
+            self._init_tables(conn)
+            rows = conn.execute(
+                'SELECT seq, role, message FROM chat_messages WHERE session_id = ? '
+                'ORDER BY seq DESC LIMIT ?', (session_id, self.max_messages)
+            ).fetchall()
+        if not rows:
+            return None
+        entries = [(row['role'], row['message']) for row in reversed(rows)]
+        return SessionHistory(session_id, self.max_messages, store=self,
+                              entries=entries, next_seq=rows[0]['seq'] + 1)
+
+    def latest_session_id(self) -> Optional[str]:
+        sessions = self.list_sessions(limit=1)
+        return sessions[0][0] if sessions else None
+
+    def list_sessions(self, limit: int = 10) -> List[Tuple[str, float, int]]:
+        """(session_id, last_active, message_count) for the most recently active sessions."""
+        self.flush()
+        with get_db_connection() as conn:
+            self._init_tables(conn)
+            rows = conn.execute('''
+                SELECT s.session_id, s.last_active,
+                       (SELECT COUNT(*) FROM chat_messages m WHERE m.session_id = s.session_id) AS messages
+                FROM chat_sessions s ORDER BY s.last_active DESC LIMIT ?
+            ''', (limit,)).fetchall()
+        return [(row['session_id'], row['last_active'], row['messages']) for row in rows]
+
+    def write(self, session_id: str, seq: int, role: str, message: str) -> None:
+        """Queue one message; flushes when the batch is full or has waited long enough."""
+        now = time.time()
+        with self._lock:
+            self._pending.append((session_id, seq, role, message, now))
+            if self._oldest_pending is None:
+                self._oldest_pending = now
+            due = len(self._pending) >= self.batch_size or now - self._oldest_pending >= self.flush_interval
+        if due:
+            self.flush()
+
+    @timed('sqlite.history_flush')
+    def flush(self) -> None:
+        """Write all pending messages in one transaction."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+            self._oldest_pending = None
+        if not pending:
+            return
+        last_active = {}
+        for session_id, _, _, _, created_at in pending:
+            last_active[session_id] = created_at
+        with get_db_connection() as conn:
+            self._init_tables(conn)
+            conn.executemany(
+                'INSERT OR REPLACE INTO chat_messages (session_id, seq, role, message, created_at) '
+                'VALUES (?, ?, ?, ?, ?)', pending
+            )
+            conn.executemany(
+                'INSERT INTO chat_sessions (session_id, created_at, last_active) VALUES (?, ?, ?) '
+                'ON CONFLICT(session_id) DO UPDATE SET last_active = excluded.last_active',
+                [(session_id, ts, ts) for session_id, ts in last_active.items()]
+            )
@@ -0,0 +1,112 @@
+"""
+Persistent cache of LLM responses in the SQLite store.
+Entries are keyed on the normalized query, the model name and a hash of the
+data summary sent with the prompt, so an answer is reused only while the
+user's data looks the same. Entries expire after a TTL and the table is kept
+under a maximum size by evicting the least recently used rows.
+"""
+
+import hashlib
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.data.cache import get_db_connection
+from src.perf.spans import timed
+
+
+def make_key(normalized_query: str, model: str, data_summary: str) -> str:
+    summary_hash = hashlib.sha256((data_summary or '').encode('utf-8')).hexdigest()
+    raw = '\0'.join((normalized_query, model, summary_hash))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMResponseCache:
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 500):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self.last_lookup_hit = False
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    def _init_table(self, conn):
+        if self._initialized:
+            return
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                query TEXT,
+                response TEXT,
+                created_at REAL,
+                last_used REAL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_llm_responses_last_used ON llm_responses (last_used)')
+        self._initialized = True
+
+    @timed('sqlite.llm_cache_get')
+    def get(self, key: str) -> Optional[str]:
+        """Return a fresh cached response, or None (always None while disabled)."""
+        self.last_lookup_hit = False
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock, get_db_connection() as conn:
+            self._init_table(conn)
+            row = conn.execute(
+                'SELECT response FROM llm_responses WHERE key = ? AND created_at >= ?',
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute('UPDATE llm_responses SET last_used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            self.last_lookup_hit = True
+            return row['response']
+
+    @timed('sqlite.llm_cache_put')
+    def put(self, key: str, model: str, query: str, response: str) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock, get_db_connection() as conn:
+            self._init_table(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO llm_responses (key, model, query, response, created_at, last_used) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, model, query, response, now, now)
+            )
+            # Expire old rows, then trim least recently used beyond max_entries
+            conn.execute('DELETE FROM llm_responses WHERE created_at < ?', (now - self.ttl_seconds,))
+            conn.execute('''
+                DELETE FROM llm_responses WHERE key IN (
+                    SELECT key FROM llm_responses ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            ''', (self.max_entries,))
+
+    def clear(self) -> None:
+        with self._lock, get_db_connection() as conn:
+            self._init_table(conn)
+            conn.execute('DELETE FROM llm_responses')
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock, get_db_connection() as conn:
+            self._init_table(conn)
+            size = conn.execute('SELECT COUNT(*) FROM llm_responses').fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'size': size,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,196 @@
+"""
+The metric registry: one entry per daily metric, declaring where it lives in
+the partner API response, how it's stored, displayed and described, and the
+phrases users call it by. The parser's extraction plan, the table DDL, the
+insert statement, the formatters and the synonym matcher are all generated
+from METRICS once at import, so adding a metric is one entry here.
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def format_percent(value: float) -> str:
+    return f"{value:.1f}%"
+
+
+def format_celsius(value: float) -> str:
+    return f"{value:.1f}°C"
+
+
+def format_int(value: float) -> str:
+    return f"{int(value)}"
+
+
+def format_minutes(value: float) -> str:
+    """Minutes as hours and minutes, e.g. 452 -> '7h 32m'."""
+    hours, minutes = divmod(int(value), 60)
+    return f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+
+
+def format_float(value: float) -> str:
+    return f"{value:.2f}"
+
+
+@dataclass(frozen=True)
+class Metric:
+    name: str
+    # Entry 'type' in the API's metrics list, and the keys to the value inside its 'object'
+    api_type: str
+    api_path: Tuple[str, ...]
+    description: str
+    formatter: Callable[[float], str] = format_float
+    # Appended to the formatted value in LLM context and reports
+    unit: Optional[str] = None
+    column_type: str = 'REAL'
+    # Phrases used in generated training queries and matched in user queries
+    synonyms: Tuple[str, ...] = ()
+    # Extra phrases matched in user queries only
+    aliases: Tuple[str, ...] = ()
+
+
+METRICS: Tuple[Metric, ...] = (
+    Metric('recovery_score', 'recovery_index', ('value',),
+           'Recovery score (0-100) indicating how well you recovered', format_int, '/100',
+           synonyms=('recovery', 'recovery score', 'recovery index', 'recovery level', 'readiness',
+                     'recovery rating')),
+    Metric('movement_score', 'movement_index', ('value',), 'Movement score based on activity', format_int, '/100',
+           synonyms=('movement', 'movement score', 'movement index', 'activity score', 'daily movement'),
+           aliases=('movement level',)),
+    Metric('sleep_score', 'sleep', ('sleep_score', 'score'), 'Overall sleep quality score', format_int, '/100',
+           synonyms=('sleep', 'sleep score', 'sleep quality', 'sleep rating', 'sleep performance')),
+    Metric('total_sleep_min', 'sleep', ('total_sleep', 'minutes'), 'Total sleep time in minutes', format_minutes,
+           synonyms=('total sleep', 'sleep time', 'sleep duration', 'hours slept', 'sleep length', 'time asleep'),
+           aliases=('hours of sleep',)),
+    Metric('sleep_efficiency', 'sleep', ('sleep_efficiency', 'percentage'), 'Sleep efficiency percentage',
+           format_percent,
+           synonyms=('sleep efficiency', 'efficiency', 'sleep quality percentage'),
+           aliases=('sleep efficiency percentage',)),
+    Metric('deep_sleep_min', 'sleep', ('deep_sleep', 'minutes'), 'Deep sleep minutes', format_minutes,
+           synonyms=('deep sleep', 'deep sleep minutes', 'deep sleep duration')),
+    Metric('rem_sleep_min', 'sleep', ('rem_sleep', 'minutes'), 'REM sleep minutes', format_minutes,
+           synonyms=('rem sleep', 'rem', 'rem duration')),
+    Metric('light_sleep_min', 'sleep', ('light_sleep', 'minutes'), 'Light sleep minutes', format_minutes,
+           synonyms=('light sleep', 'light sleep minutes'),
+           aliases=('light sleep duration',)),
+    Metric('avg_temperature', 'sleep', ('average_body_temperature', 'celsius'),
+           'Average skin temperature during sleep', format_celsius,
+           synonyms=('temperature', 'skin temperature', 'body temperature', 'avg temp'),
+           aliases=('skin temp', 'body temp')),
+    Metric('total_steps', 'steps', ('total',), 'Daily step count', format_int, 'steps',
+           synonyms=('steps', 'step count', 'steps taken', 'daily steps', 'how many steps')),
+    # Average HRV during sleep, already aggregated by the API
+    Metric('hrv_avg', 'avg_sleep_hrv', ('value',), 'Average heart rate variability', format_int, 'ms',
+           synonyms=('hrv', 'heart rate variability', 'hrv average')),
+    Metric('rhr_avg', 'night_rhr', ('avg',), 'Resting heart rate', format_int, 'bpm',
+           synonyms=('resting heart rate', 'rhr', 'resting hr', 'night rhr')),
+    Metric('active_minutes', 'active_minutes', ('value',), 'Active minutes', format_minutes,
+           synonyms=('active minutes', 'activity minutes', 'active time', 'exercise time')),
+    Metric('vo2_max', 'vo2_max', ('value',), 'VO2 max estimate', format_int, 'ml/kg/min',
+           synonyms=('vo2 max', 'vo2', 'cardio fitness', 'fitness level')),
+)
+
+METRIC_NAMES: List[str] = [m.name for m in METRICS]
+METRICS_BY_NAME: Dict[str, Metric] = {m.name: m for m in METRICS}
+METRIC_DESCRIPTIONS: Dict[str, str] = {m.name: m.description for m in METRICS}
+METRIC_UNITS: Dict[str, str] = {m.name: m.unit for m in METRICS if m.unit}
+METRIC_SYNONYMS: Dict[str, List[str]] = {m.name: list(m.synonyms) for m in METRICS}
+
+
+# --- Parser plan: API entry type -> ((metric, getter), ...) ---
+
+def _getter(path: Tuple[str, ...]) -> Callable[[Any], Any]:
+    """A function reading obj[path[0]][path[1]]..., or None where a level is missing."""
+    if len(path) == 1:
+        key = path[0]
+        return lambda obj: obj.get(key) if isinstance(obj, dict) else None
+    if len(path) == 2:
+        outer, inner = path
+
+        def get(obj):
+            if not isinstance(obj, dict):
+                return None
+            nested = obj.get(outer)
+            return nested.get(inner) if isinstance(nested, dict) else None
+        return get
+
+    def get_deep(obj):
+        for key in path:
+            if not isinstance(obj, dict):
+                return None
+            obj = obj.get(key)
+        return obj
+    return get_deep
+
+
+PARSE_PLAN: Dict[str, Tuple[Tuple[str, Callable[[Any], Any]], ...]] = {}
+for _metric in METRICS:
+    PARSE_PLAN[_metric.api_type] = PARSE_PLAN.get(_metric.api_type, ()) + ((_metric.name, _getter(_metric.api_path)),)
+
+
+# --- Storage ---
+
+CREATE_TABLE_SQL = (
+    'CREATE TABLE IF NOT EXISTS daily_metrics (date TEXT PRIMARY KEY, '
+    + ', '.join(f'{m.name} {m.column_type}' for m in METRICS)
+    + ', raw_json TEXT)'
+)
+INSERT_SQL = (
+    f"INSERT OR REPLACE INTO daily_metrics (date, {', '.join(METRIC_NAMES)}, raw_json) "
+    f"VALUES ({', '.join('?' * (len(METRICS) + 2))})"
+)
+
+
+def missing_columns_sql(existing_columns) -> List[str]:
+    """ALTER TABLE statements for registry metrics added since the table was created."""
+    existing = set(existing_columns)
+    return [f'ALTER TABLE daily_metrics ADD COLUMN {m.name} {m.column_type}'
+            for m in METRICS if m.name not in existing]
+
+
+def insert_row(date_str: str, metrics: Dict[str, Optional[float]], raw_json_str: Optional[str]) -> tuple:
+    """Parameters for INSERT_SQL in column order."""
+    return (date_str, *[metrics.get(name) for name in METRIC_NAMES], raw_json_str)
+
+
+# --- Formatting ---
+
+_FORMATTERS: Dict[str, Callable[[float], str]] = {m.name: m.formatter for m in METRICS}
+
+
+def format_value(metric: str, value: Optional[float]) -> str:
+    """Format a metric value with appropriate units or rounding."""
+    if value is None:
+        return "No data available"
+    return _FORMATTERS.get(metric, format_float)(value)
+
+
+def format_metric(metric: str, value: Optional[float]) -> str:
+    """format_value plus the metric's unit, e.g. '55 ms' or '82/100'."""
+    formatted = format_value(metric, value)
+    unit = METRIC_UNITS.get(metric)
+    if unit == '/100':
+        return f"{formatted}/100"
+    return f"{formatted} {unit}" if unit else formatted
+
+
+# --- Synonym matching ---
+
+SYNONYM_TO_METRIC: Dict[str, str] = {}
+for _metric in METRICS:
+    for _phrase in _metric.synonyms + _metric.aliases:
+        SYNONYM_TO_METRIC[_phrase.lower()] = _metric.name
+
+# One pass over the query. Longer phrases are tried first so "deep sleep"
+# wins over "sleep"; whole words only (plus plural/-ing), so "rem" doesn't
+# match "remember".
+_SYNONYM_RE = re.compile(
+    r'\b(' + '|'.join(re.escape(p) for p in sorted(SYNONYM_TO_METRIC, key=len, reverse=True)) + r')(?:s|ing)?\b'
+)
+
+
+def match_metric(query_lower: str) -> Optional[str]:
+    """The metric named in an already lowercased query (the first mention), or None."""
+    match = _SYNONYM_RE.search(query_lower)
+    return SYNONYM_TO_METRIC[match.group(1)] if match else None
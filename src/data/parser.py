@@ -1,7 +1,8 @@
 import logging
 from typing import Dict, Any, Optional
 
-logging.basicConfig(level=logging.INFO)
+from src.data.metrics import METRIC_NAMES, PARSE_PLAN
+
 logger = logging.getLogger(__name__)
 
 
@@ -29,22 +30,7 @@ def parse_daily_metrics(api_response: Dict[str, Any]) -> Dict[str, Optional[floa
     }
     """
     # Initialize all metrics with None
-    metrics = {
-        'recovery_score': None,
-        'movement_score': None,
-        'sleep_score': None,
-        'total_sleep_min': None,
-        'sleep_efficiency': None,
-        'deep_sleep_min': None,
-        'rem_sleep_min': None,
-        'light_sleep_min': None,
-        'avg_temperature': None,
-        'total_steps': None,
-        'hrv_avg': None,
-        'rhr_avg': None,
-        'active_minutes': None,
-        'vo2_max': None,
-    }
+    metrics = dict.fromkeys(METRIC_NAMES)
 
     # Navigate to the metrics list
     try:
@@ -60,53 +46,17 @@ def parse_daily_metrics(api_response: Dict[str, Any]) -> Dict[str, Optional[floa
         logger.error(f"Unexpected API response structure: {e}")
         return metrics
 
-    # Process each metric object in the list
+    # Process each metric object in the list, following the registry's extraction plan
     for item in metrics_list:
         if not isinstance(item, dict):
             continue
-        metric_type = item.get('type')
+        plan = PARSE_PLAN.get(item.get('type'))
+        if plan is None:
+            # Types like 'hr', 'temp', 'spo2' and 'sleep_rhr' aren't in the registry
+            continue
         obj = item.get('object', {})
-
-        if metric_type == 'recovery_index':
-            metrics['recovery_score'] = _safe_float(obj.get('value'))
-        elif metric_type == 'movement_index':
-            metrics['movement_score'] = _safe_float(obj.get('value'))
-        elif metric_type == 'sleep':
-            # Extract sleep-related metrics from the nested sleep object
-            sleep_score_obj = obj.get('sleep_score', {})
-            metrics['sleep_score'] = _safe_float(sleep_score_obj.get('score'))
-
-            total_sleep_obj = obj.get('total_sleep', {})
-            metrics['total_sleep_min'] = _safe_float(total_sleep_obj.get('minutes'))
-
-            sleep_efficiency_obj = obj.get('sleep_efficiency', {})
-            metrics['sleep_efficiency'] = _safe_float(sleep_efficiency_obj.get('percentage'))
-
-            deep_sleep_obj = obj.get('deep_sleep', {})
-            metrics['deep_sleep_min'] = _safe_float(deep_sleep_obj.get('minutes'))
-
-            rem_sleep_obj = obj.get('rem_sleep', {})
-            metrics['rem_sleep_min'] = _safe_float(rem_sleep_obj.get('minutes'))
-
-            light_sleep_obj = obj.get('light_sleep', {})
-            metrics['light_sleep_min'] = _safe_float(light_sleep_obj.get('minutes'))
-
-            avg_temp_obj = obj.get('average_body_temperature', {})
-            metrics['avg_temperature'] = _safe_float(avg_temp_obj.get('celsius'))
-        elif metric_type == 'steps':
-            metrics['total_steps'] = _safe_float(obj.get('total'))
-        elif metric_type == 'avg_sleep_hrv':
-            # This is the average HRV during sleep (already aggregated)
-            metrics['hrv_avg'] = _safe_float(obj.get('value'))
-        elif metric_type == 'night_rhr':
-            # Resting heart rate average
-            metrics['rhr_avg'] = _safe_float(obj.get('avg'))
-        elif metric_type == 'active_minutes':
-            metrics['active_minutes'] = _safe_float(obj.get('value'))
-        elif metric_type == 'vo2_max':
-            metrics['vo2_max'] = _safe_float(obj.get('value'))
-        # Note: There are also types like 'hr', 'temp', 'spo2', 'sleep_rhr' which we may ignore
-        # for our core metrics, but could be added later.
+        for name, get in plan:
+            metrics[name] = _safe_float(get(obj))
 
     return metrics
 
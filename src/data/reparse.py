@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+"""
+Reparse the raw API payloads already stored in daily_metrics, so metrics the
+parser has learned since a day was fetched are filled in without refetching.
+Rows are read from SQLite in date order a chunk at a time, parsed in a process
+pool, and only the columns whose value changed are written back. Writes are
+committed in batches together with a date cursor and a bump of the store's
+data version (so cached answers built from the old values are dropped), and
+an interrupted run resumes where the last commit left off.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.data import cache
+from src.data.metrics import METRIC_NAMES
+from src.data.parser import parse_daily_metrics
+
+CURSOR_TABLE_SQL = 'CREATE TABLE IF NOT EXISTS reparse_cursor (job TEXT PRIMARY KEY, last_date TEXT)'
+JOB = 'raw_json'
+
+# (date, changed columns, new values)
+Change = Tuple[str, Tuple[str, ...], Tuple[float, ...]]
+
+
+def read_chunks(conn: sqlite3.Connection, after: Optional[str], chunk_size: int) -> Iterator[List[tuple]]:
+    """
+    (date, raw_json, stored metric values...) rows with a payload, in date
+    order, chunk_size at a time. Paged by date rather than OFFSET so each
+    chunk is an index seek.
+    """
+    sql = (f"SELECT date, raw_json, {', '.join(METRIC_NAMES)} FROM daily_metrics "
+           f"WHERE date > ? AND raw_json IS NOT NULL ORDER BY date LIMIT ?")
+    cursor = after or ''
+    while True:
+        rows = conn.execute(sql, (cursor, chunk_size)).fetchall()
+        if not rows:
+            return
+        yield rows
+        cursor = rows[-1][0]
+
+
+def parse_chunk(rows: List[tuple]) -> Tuple[List[Change], int]:
+    """
+    Reparse a chunk; runs in a worker process. Returns the changed columns per
+    row and the number of payloads that couldn't be read. A metric the
+    parser finds no value for never clears a stored one.
+    """
+    changes, errors = [], 0
+    for date_str, raw_json, *stored in rows:
+        try:
+            metrics = parse_daily_metrics(json.loads(raw_json))
+        except (ValueError, TypeError, AttributeError):
+            errors += 1
+            continue
+        columns, values = [], []
+        for name, old in zip(METRIC_NAMES, stored):
+            new = metrics[name]
+            if new is not None and new != old:
+                columns.append(name)
+                values.append(new)
+        if columns:
+            changes.append((date_str, tuple(columns), tuple(values)))
+    return changes, errors
+
+
+def apply_changes(conn: sqlite3.Connection, changes: List[Change]) -> int:
+    """UPDATE the changed columns, one executemany per distinct column set. Returns cells written."""
+    by_columns: Dict[Tuple[str, ...], List[tuple]] = {}
+    for date_str, columns, values in changes:
+        by_columns.setdefault(columns, []).append((*values, date_str))
+    for columns, params in by_columns.items():
+        assignments = ', '.join(f'{name} = ?' for name in columns)
+        conn.executemany(f'UPDATE daily_metrics SET {assignments} WHERE date = ?', params)
+    return sum(len(columns) for _, columns, _ in changes)
+
+
+def parsed_chunks(chunks: Iterator[List[tuple]], workers: Optional[int]):
+    """Yield (chunk's last date, row count, parse_chunk result) in date order."""
+    if workers == 0:
+        for rows in chunks:
+            yield rows[-1][0], len(rows), parse_chunk(rows)
+        return
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for rows in chunks:
+            pending.append((rows[-1][0], len(rows), pool.submit(parse_chunk, rows)))
+            # Enough chunks in flight to keep every worker busy without reading the whole table
+            if len(pending) >= workers * 4:
+                last_date, count, future = pending.popleft()
+                yield last_date, count, future.result()
+        while pending:
+            last_date, count, future = pending.popleft()
+            yield last_date, count, future.result()
+
+
+def reparse(db_path: str, workers: Optional[int] = None, chunk_size: int = 500,
+            commit_rows: int = 5000, restart: bool = False, progress=None) -> Dict:
+    """
+    Reparse every stored payload after the saved cursor. Returns the run's
+    totals: rows, changed rows, cells, errors, seconds, rows_per_s.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(CURSOR_TABLE_SQL)
+        cache.create_data_version(conn)
+        if restart:
+            conn.execute('DELETE FROM reparse_cursor WHERE job = ?', (JOB,))
+        conn.commit()
+        row = conn.execute('SELECT last_date FROM reparse_cursor WHERE job = ?', (JOB,)).fetchone()
+        resumed_from = row[0] if row else None
+
+        totals = {'resumed_from': resumed_from, 'rows': 0, 'changed_rows': 0, 'cells': 0, 'errors': 0}
+        start = time.perf_counter()
+        batch: List[Change] = []
+        batch_rows = 0
+        last_date = None
+
+        def commit():
+            # The cursor and data version move in the same transaction as the updates they cover
+            with conn:
+                totals['cells'] += apply_changes(conn, batch)
+                if batch:
+                    cache.bump_data_version(conn)
+                conn.execute('INSERT OR REPLACE INTO reparse_cursor (job, last_date) VALUES (?, ?)',
+                             (JOB, last_date))
+            totals['changed_rows'] += len(batch)
+            if progress:
+                elapsed = time.perf_counter() - start
+                progress(f"through {last_date}: {totals['rows']} rows, {totals['changed_rows']} changed, "
+                         f"{totals['rows'] / elapsed if elapsed else 0:.0f} rows/s")
+
+        for last_date, count, (changes, errors) in parsed_chunks(read_chunks(conn, resumed_from, chunk_size),
+                                                                 workers):
+            batch.extend(changes)
+            batch_rows += count
+            totals['rows'] += count
+            totals['errors'] += errors
+            if batch_rows >= commit_rows:
+                commit()
+                batch, batch_rows = [], 0
+        if batch_rows:
+            commit()
+
+        # Finished: the next run starts from the beginning again
+        with conn:
+            conn.execute('DELETE FROM reparse_cursor WHERE job = ?', (JOB,))
+    finally:
+        conn.close()
+    totals['seconds'] = time.perf_counter() - start
+    totals['rows_per_s'] = totals['rows'] / totals['seconds'] if totals['seconds'] else 0.0
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refill metric columns from stored raw API payloads")
+    parser.add_argument('--db', default=cache.DB_PATH, help='SQLite store (default: the local cache)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='parser processes (default: one per CPU; 0 parses in this process)')
+    parser.add_argument('--chunk-size', type=int, default=500, help='rows read and handed to a worker at a time')
+    parser.add_argument('--commit-rows', type=int, default=5000,
+                        help='rows covered by each transaction (and each cursor save)')
+    parser.add_argument('--restart', action='store_true', help='ignore a saved cursor and start from the first day')
+    args = parser.parse_args(argv)
+
+    # Adds columns for metrics registered since the store was created, so they can be filled
+    cache.DB_PATH = args.db
+    cache.init_db()
+    totals = reparse(args.db, args.workers, args.chunk_size, args.commit_rows, args.restart,
+                     progress=lambda line: print(line, file=sys.stderr))
+    if totals['resumed_from']:
+        print(f"Resumed after {totals['resumed_from']}.")
+    print(f"Reparsed {totals['rows']} rows in {totals['seconds']:.2f}s ({totals['rows_per_s']:.0f} rows/s): "
+          f"{totals['changed_rows']} rows changed, {totals['cells']} values written, "
+          f"{totals['errors']} unreadable payloads.")
+
+
+if __name__ == "__main__":
+    main()
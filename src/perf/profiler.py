@@ -0,0 +1,213 @@
+"""
+On-demand profiling of chat turns with cProfile and tracemalloc.
+While on, each turn is profiled and added to one accumulated profile; a dump
+writes a hotspot report and an allocation report that attribute time and
+memory to this project's modules (entity_extractor, response_generator,
+cache, ...) as well as listing the top functions overall.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from typing import Dict, Optional, Tuple
+
+# Server mode: profile this many turns after startup, then write the reports
+PROFILE_ENV = 'COACH_PROFILE_TURNS'
+PROFILE_DIR = os.path.join('data', 'profiles')
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SOURCE_ROOT = os.path.join(PROJECT_ROOT, 'src')
+# Frames kept per allocation; enough to walk from library code back to ours
+TRACE_FRAMES = 25
+
+
+def project_module(filename: str) -> Optional[str]:
+    """'chatbot.entity_extractor' for a file under src/, None for anything else."""
+    path = os.path.abspath(filename)
+    if not path.startswith(SOURCE_ROOT + os.sep):
+        return None
+    return os.path.splitext(os.path.relpath(path, SOURCE_ROOT))[0].replace(os.sep, '.')
+
+
+def module_times(stats: pstats.Stats) -> Dict[str, Tuple[float, float]]:
+    """
+    module -> (self seconds, inclusive seconds) for project modules. Inclusive
+    time counts calls entering the module from outside it, so time spent in
+    libraries it calls is charged to it without double counting.
+    """
+    totals: Dict[str, Tuple[float, float]] = {}
+    for (filename, _, _), (_, _, tottime, cumtime, callers) in stats.stats.items():
+        module = project_module(filename)
+        if module is None:
+            continue
+        if callers:
+            inclusive = sum(caller_stats[3] for caller, caller_stats in callers.items()
+                            if project_module(caller[0]) != module)
+        else:
+            # Called from a frame that was already running when profiling started
+            inclusive = cumtime
+        self_s, incl_s = totals.get(module, (0.0, 0.0))
+        totals[module] = (self_s + tottime, incl_s + inclusive)
+    return totals
+
+
+def allocation_sites(before, after, top: int):
+    """
+    Net memory growth between two tracemalloc snapshots, charged to the most
+    recent frame in our source tree: (by module, by module:line) in bytes.
+    """
+    by_module: Dict[str, int] = {}
+    by_line: Dict[str, int] = {}
+    for diff in after.compare_to(before, 'traceback'):
+        if diff.size_diff <= 0:
+            continue
+        site = None
+        # Tracebacks are stored most recent call last
+        for frame in reversed(diff.traceback):
+            module = project_module(frame.filename)
+            if module is not None:
+                site = (module, f"{module}:{frame.lineno}")
+                break
+        if site is None:
+            frame = diff.traceback[-1]
+            site = ('(other)', f"{os.path.basename(frame.filename)}:{frame.lineno}")
+        by_module[site[0]] = by_module.get(site[0], 0) + diff.size_diff
+        by_line[site[1]] = by_line.get(site[1], 0) + diff.size_diff
+    ranked = lambda d: sorted(d.items(), key=lambda kv: -kv[1])[:top]
+    return ranked(by_module), ranked(by_line)
+
+
+class TurnProfiler:
+    def __init__(self, output_dir: str = PROFILE_DIR, top: int = 30):
+        self.output_dir = output_dir
+        self.top = top
+        self.active = False
+        # Turns left before the reports are written automatically; None means until off
+        self.remaining: Optional[int] = None
+        self.turns = 0
+        self._profile = None
+        self._baseline = None
+        self._started_tracemalloc = False
+        # cProfile can't profile several threads at once everywhere, so only one call at a time
+        self._busy = threading.Lock()
+        self._local = threading.local()
+
+    def on(self, turns: Optional[int] = None) -> None:
+        """Profile every following turn, or only the next `turns` of them."""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self.turns = 0
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACE_FRAMES)
+                self._started_tracemalloc = True
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.take_snapshot()
+        self.remaining = turns
+        self.active = True
+
+    def off(self) -> None:
+        """Stop profiling new turns; what was collected stays until dump()."""
+        self.active = False
+
+    def begin(self) -> None:
+        """Start profiling a turn on this thread (the chat loop)."""
+        if self.active and self._busy.acquire(blocking=False):
+            self._local.profiling = True
+            self._profile.enable()
+
+    def end(self) -> Optional[Tuple[str, str]]:
+        """End a turn started with begin(); returns report paths if this was the last one."""
+        if getattr(self._local, 'profiling', False):
+            self._profile.disable()
+            self._local.profiling = False
+            self._busy.release()
+            return self.turn_done()
+        return None
+
+    def call(self, fn, *args):
+        """Run fn(*args), profiled if profiling is on and no other call is being profiled."""
+        if not self.active or not self._busy.acquire(blocking=False):
+            return fn(*args)
+        try:
+            return self._profile.runcall(fn, *args)
+        finally:
+            self._busy.release()
+
+    def turn_done(self) -> Optional[Tuple[str, str]]:
+        """Count a profiled turn; after the requested number, write the reports and stop."""
+        if not self.active:
+            return None
+        self.turns += 1
+        if self.remaining is not None:
+            self.remaining -= 1
+            if self.remaining <= 0:
+                self.off()
+                return self.dump()
+        return None
+
+    def dump(self) -> Optional[Tuple[str, str]]:
+        """Write the hotspot and allocation reports and start a fresh collection."""
+        if self._profile is None:
+            return None
+        with self._busy:
+            profile, self._profile = self._profile, cProfile.Profile()
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.output_dir, f"turns_{stamp}")
+        profile.dump_stats(base + '.prof')
+
+        hotspots = base + '_hotspots.txt'
+        with open(hotspots, 'w') as f:
+            f.write(self._hotspot_report(profile))
+
+        allocations = base + '_allocations.txt'
+        with open(allocations, 'w') as f:
+            f.write(self._allocation_report())
+
+        self.turns = 0
+        if not self.active:
+            self._profile = None
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+        return hotspots, allocations
+
+    def _hotspot_report(self, profile) -> str:
+        out = io.StringIO()
+        try:
+            stats = pstats.Stats(profile, stream=out)
+        except TypeError:
+            # Nothing was profiled
+            return "No turns were profiled.\n"
+        out.write(f"Turns profiled: {self.turns}\n\n")
+        out.write(f"{'module':<40}{'self s':>10}{'incl. s':>10}\n")
+        for module, (self_s, incl_s) in sorted(module_times(stats).items(), key=lambda kv: -kv[1][1]):
+            out.write(f"{module:<40}{self_s:>10.4f}{incl_s:>10.4f}\n")
+        out.write("\nTop functions by cumulative time:\n")
+        stats.sort_stats('cumulative').print_stats(self.top)
+        out.write("Top functions by own time:\n")
+        stats.sort_stats('tottime').print_stats(self.top)
+        return out.getvalue()
+
+    def _allocation_report(self) -> str:
+        if not tracemalloc.is_tracing() or self._baseline is None:
+            return "tracemalloc was not running.\n"
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        by_module, by_line = allocation_sites(self._baseline, snapshot, self.top)
+        self._baseline = snapshot
+        tracemalloc.reset_peak()
+        # tracemalloc sees live blocks only: growth is what the turns kept, peak the high-water mark
+        lines = [f"Traced memory: {current / 1024:.1f} KiB now, {peak / 1024:.1f} KiB peak", "",
+                 "Net growth by module (KiB):"]
+        lines += [f"  {module:<40}{size / 1024:>10.1f}" for module, size in by_module]
+        lines += ["", "Net growth by line (KiB):"]
+        lines += [f"  {site:<40}{size / 1024:>10.1f}" for site, size in by_line]
+        return "\n".join(lines) + "\n"
+
+
+profiler = TurnProfiler()
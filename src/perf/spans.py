@@ -0,0 +1,124 @@
+"""
+Lightweight span timing for the chat pipeline. Every span goes into a
+bounded in-memory window per stage, summarized by /stats; when a trace file
+is set, each span is also written to it as one JSON line for offline analysis.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+from typing import Dict, Optional
+
+from src.perf.stats import summarize
+
+# Set to a file path to write JSON-lines traces from startup
+TRACE_ENV = 'COACH_TRACE'
+# Samples kept per stage; percentiles describe the most recent ones
+DEFAULT_WINDOW = 2048
+
+# Turn the current span belongs to, so trace lines can be grouped per message
+_turn = contextvars.ContextVar('turn', default=None)
+_turn_ids = itertools.count(1)
+
+
+def new_turn() -> int:
+    """Start a new turn in the current context; later spans are tagged with its id."""
+    turn_id = next(_turn_ids)
+    _turn.set(turn_id)
+    return turn_id
+
+
+class SpanRecorder:
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._trace = None
+        self.trace_path: Optional[str] = None
+
+    def record(self, stage: str, seconds: float, **attrs) -> None:
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            if self._trace is not None:
+                entry = {'ts': time.time(), 'turn': _turn.get(), 'stage': stage,
+                         'ms': round(seconds * 1000, 3)}
+                entry.update(attrs)
+                self._trace.write(json.dumps(entry, default=str) + '\n')
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-stage summary (milliseconds) of the recent window, plus the all-time count."""
+        with self._lock:
+            snapshot = {stage: (list(samples), self._counts[stage]) for stage, samples in self._samples.items()}
+        return {stage: dict(summarize(samples), total=count) for stage, (samples, count) in sorted(snapshot.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self._counts.clear()
+
+    def start_trace(self, path: str) -> None:
+        """Append every following span to path as JSON lines."""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Line-buffered so a crash loses at most the span being written
+        trace = open(path, 'a', buffering=1, encoding='utf-8')
+        with self._lock:
+            previous, self._trace, self.trace_path = self._trace, trace, path
+        if previous is not None:
+            previous.close()
+
+    def stop_trace(self) -> None:
+        with self._lock:
+            trace, self._trace, self.trace_path = self._trace, None, None
+        if trace is not None:
+            trace.close()
+
+
+recorder = SpanRecorder()
+if os.environ.get(TRACE_ENV):
+    recorder.start_trace(os.environ[TRACE_ENV])
+
+
+class _Span:
+    __slots__ = ('stage', 'attrs', 'start')
+
+    def __init__(self, stage, attrs):
+        self.stage = stage
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        recorder.record(self.stage, time.perf_counter() - self.start, **self.attrs)
+
+
+def span(stage: str, **attrs) -> _Span:
+    """Time a block: `with span('sqlite.fetch_metrics'): ...`. attrs only go to the trace."""
+    return _Span(stage, attrs)
+
+
+def timed(stage: str):
+    """Decorator form of span for whole functions."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
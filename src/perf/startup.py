@@ -0,0 +1,80 @@
+"""
+Startup profiling: re-run the app under `python -X importtime`, stop it at
+the first prompt, and summarize where the time went.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+# The profiled process prints this line at its first prompt: marker, seconds since launch, stage=seconds...
+READY_MARKER = 'STARTUP_READY'
+LAUNCH_ENV = 'COACH_STARTUP_LAUNCHED_AT'
+
+_IMPORTTIME_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """(module, self_us, cumulative_us, depth) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def by_package(rows) -> Dict[str, int]:
+    """Self time in microseconds grouped by top-level package."""
+    totals: Dict[str, int] = {}
+    for module, self_us, _, _ in rows:
+        package = module.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def report_ready(stage_timings: Dict[str, float]) -> None:
+    """Called by the profiled child at the first prompt; prints timings and exits at once."""
+    launched = float(os.environ.get(LAUNCH_ENV, time.time()))
+    stages = ' '.join(f"{name}={seconds:.6f}" for name, seconds in stage_timings.items())
+    print(f"{READY_MARKER} {time.time() - launched:.6f} {stages}", flush=True)
+    # Skip interpreter shutdown and background threads; only time to prompt matters
+    os._exit(0)
+
+
+def profile_startup(script: str, args: List[str], top: int = 15, target_ms: float = 200.0) -> None:
+    """Run `script` under -X importtime until its first prompt and print a breakdown."""
+    env = dict(os.environ, **{LAUNCH_ENV: repr(time.time())})
+    proc = subprocess.run([sys.executable, '-X', 'importtime', script, *args],
+                          env=env, capture_output=True, text=True, stdin=subprocess.DEVNULL)
+    ready = [line for line in proc.stdout.splitlines() if line.startswith(READY_MARKER)]
+    if not ready:
+        print("The app exited before reaching the prompt:")
+        print(proc.stdout[-2000:], proc.stderr[-2000:])
+        return
+
+    fields = ready[-1].split()
+    to_prompt_ms = float(fields[1]) * 1000
+    stages = {name: float(value) * 1000 for name, value in (f.split('=') for f in fields[2:])}
+    rows = parse_importtime(proc.stderr)
+    # Top-level lines are imports made directly by the app or by site at interpreter start
+    top_level = [r for r in rows if r[3] == 0]
+    import_ms = sum(r[2] for r in top_level) / 1000
+
+    status = "OK" if to_prompt_ms <= target_ms else "over target"
+    print(f"Launch to prompt: {to_prompt_ms:.0f} ms (target {target_ms:.0f} ms, {status})")
+    print(f"  imports: {import_ms:.0f} ms across {len(rows)} modules")
+    for name, ms in stages.items():
+        print(f"  {name}: {ms:.1f} ms")
+
+    print(f"\n{'package':<32}{'self ms':>10}")
+    for package, us in sorted(by_package(rows).items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{package:<32}{us / 1000:>10.1f}")
+
+    print(f"\n{'direct import':<32}{'cumulative ms':>14}")
+    for module, _, cumulative_us, _ in sorted(top_level, key=lambda r: -r[2])[:top]:
+        print(f"{module:<32}{cumulative_us / 1000:>14.1f}")
@@ -0,0 +1,35 @@
+"""
+Latency summary helpers shared by the benchmarks and runtime instrumentation.
+"""
+
+import math
+from typing import Dict, Iterable, List
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0-100) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * q / 100.0
+    lo = math.floor(pos)
+    hi = math.ceil(pos)
+    if lo == hi:
+        return sorted_values[lo]
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(seconds: Iterable[float]) -> Dict[str, float]:
+    """Summarize durations given in seconds; all outputs are in milliseconds."""
+    values = sorted(s * 1000.0 for s in seconds)
+    if not values:
+        return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0, 'max_ms': 0.0}
+    return {
+        'count': len(values),
+        'mean_ms': sum(values) / len(values),
+        'p50_ms': percentile(values, 50),
+        'p95_ms': percentile(values, 95),
+        'p99_ms': percentile(values, 99),
+        'max_ms': values[-1],
+    }
@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+"""
+Weekly health reports for many users.
+Each user is one SQLite store (a <user>.db file with the daily_metrics
+table). Users are split into shards handled by a process pool; within a
+shard the two weeks of rows for every user are loaded into one array and the
+weekly aggregates, trends and week-over-week changes are computed for all of
+them at once with NumPy. The LLM is called only for the optional narrative.
+Each user gets a Markdown and a JSON report, plus an index for the run.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from src.data import cache
+from src.data.metrics import METRIC_NAMES, format_metric
+
+REPORTS_DIR = os.path.join('data', 'reports')
+# Relative change across the week (slope x 6 days vs the mean) below which a trend is "steady"
+STEADY_FRACTION = 0.03
+# Per-process LLM client, created once when narratives are enabled
+_llm = {}
+
+
+def discover_users(users_dir: Optional[str]) -> List[Tuple[str, str]]:
+    """(user, db path) pairs: every <user>.db in users_dir, or the local store as "me"."""
+    if users_dir is None:
+        return [('me', cache.DB_PATH)]
+    paths = sorted(glob.glob(os.path.join(users_dir, '*.db')))
+    return [(os.path.splitext(os.path.basename(path))[0], path) for path in paths]
+
+
+def load_shard(users: List[Tuple[str, str]], start: date, end: date) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Rows between start and end for every user in the shard, stacked:
+    (user index per row, day offset from start per row, values with NaN for missing).
+    """
+    columns = ', '.join(METRIC_NAMES)
+    user_index, offsets, values = [], [], []
+    for i, (_, path) in enumerate(users):
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        except sqlite3.OperationalError:
+            continue
+        try:
+            rows = conn.execute(
+                f'SELECT date, {columns} FROM daily_metrics WHERE date BETWEEN ? AND ?',
+                (start.isoformat(), end.isoformat())
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No daily_metrics table yet
+            rows = []
+        finally:
+            conn.close()
+        for row in rows:
+            user_index.append(i)
+            offsets.append((date.fromisoformat(row[0]) - start).days)
+            values.append(row[1:])
+    # None becomes NaN
+    matrix = np.array(values, dtype=np.float64).reshape(len(values), len(METRIC_NAMES))
+    return np.array(user_index, dtype=np.int64), np.array(offsets, dtype=np.int64), matrix
+
+
+def weekly_aggregates(user_index: np.ndarray, offsets: np.ndarray, values: np.ndarray,
+                      n_users: int) -> Dict[str, np.ndarray]:
+    """
+    Per-user, per-metric aggregates over a 14-day window (offsets 0-6 are the
+    previous week, 7-13 this week). Every array is (n_users, n_metrics).
+    """
+    n_metrics = values.shape[1]
+    this_week = offsets >= 7
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    # One group per (user, week) row; bincount sums each metric column into it
+    groups = user_index * 2 + this_week
+
+    def group_sum(weights):
+        return np.stack([np.bincount(groups, weights[:, m], minlength=n_users * 2)
+                         for m in range(n_metrics)], axis=1).reshape(n_users, 2, n_metrics)
+
+    counts = group_sum(present.astype(np.float64))
+    sums = group_sum(filled)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = sums / counts
+
+    minimum = np.full((n_users * 2, n_metrics), np.inf)
+    maximum = np.full((n_users * 2, n_metrics), -np.inf)
+    np.minimum.at(minimum, groups, np.where(present, values, np.inf))
+    np.maximum.at(maximum, groups, np.where(present, values, -np.inf))
+    minimum = minimum.reshape(n_users, 2, n_metrics)
+    maximum = maximum.reshape(n_users, 2, n_metrics)
+
+    # Least-squares slope per day over this week, from per-group sums
+    x = np.where(present, (offsets - 7)[:, None].astype(np.float64), 0.0)
+    sx, sy, sxx, sxy = (group_sum(w)[:, 1] for w in (x, filled, x * x, x * filled))
+    n = counts[:, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+    slope[n < 3] = np.nan
+
+    this_mean, prev_mean = means[:, 1], means[:, 0]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change_pct = (this_mean - prev_mean) / np.abs(prev_mean) * 100
+    return {
+        'days': counts[:, 1],
+        'mean': this_mean,
+        'min': np.where(counts[:, 1] > 0, minimum[:, 1], np.nan),
+        'max': np.where(counts[:, 1] > 0, maximum[:, 1], np.nan),
+        'prev_days': counts[:, 0],
+        'prev_mean': prev_mean,
+        'change': this_mean - prev_mean,
+        'change_pct': change_pct,
+        'slope_per_day': slope,
+    }
+
+
+def _trend(mean: float, slope: float) -> Optional[str]:
+    if np.isnan(slope) or np.isnan(mean):
+        return None
+    if mean == 0 or abs(slope * 6) < STEADY_FRACTION * abs(mean):
+        return 'steady'
+    return 'rising' if slope > 0 else 'falling'
+
+
+def _number(value) -> Optional[float]:
+    return None if np.isnan(value) else round(float(value), 3)
+
+
+def user_report(user: str, start: date, end: date, aggregates: Dict[str, np.ndarray], i: int) -> Dict:
+    metrics = {}
+    for m, metric in enumerate(METRIC_NAMES):
+        if not aggregates['days'][i, m] and not aggregates['prev_days'][i, m]:
+            continue
+        entry = {key: _number(values[i, m]) for key, values in aggregates.items()}
+        entry['days'] = int(aggregates['days'][i, m])
+        entry['prev_days'] = int(aggregates['prev_days'][i, m])
+        entry['trend'] = _trend(aggregates['mean'][i, m], aggregates['slope_per_day'][i, m])
+        metrics[metric] = entry
+    return {'user': user, 'week_start': start.isoformat(), 'week_end': end.isoformat(),
+            'metrics': metrics, 'narrative': None}
+
+
+def report_facts(report: Dict) -> str:
+    """Plain-text summary of a report, used as the narrative prompt."""
+    lines = []
+    for metric, entry in report['metrics'].items():
+        if entry['mean'] is None:
+            continue
+        line = f"{metric}: {format_metric(metric, entry['mean'])} average over {entry['days']} days"
+        if entry['change_pct'] is not None:
+            line += f", {entry['change_pct']:+.0f}% vs last week"
+        if entry['trend']:
+            line += f", {entry['trend']} during the week"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def render_markdown(report: Dict) -> str:
+    lines = [f"# Weekly health report: {report['user']}", "",
+             f"{report['week_start']} to {report['week_end']}", ""]
+    if report['narrative']:
+        lines += [report['narrative'], ""]
+    if not report['metrics']:
+        lines.append("No data for this week or the one before.")
+        return "\n".join(lines) + "\n"
+    lines += ["| Metric | This week | Range | Last week | Change | Trend | Days |",
+              "|---|---|---|---|---|---|---|"]
+    for metric, e in report['metrics'].items():
+        fmt = lambda v: format_metric(metric, v) if v is not None else "-"
+        value_range = f"{fmt(e['min'])} - {fmt(e['max'])}" if e['min'] is not None else "-"
+        change = f"{e['change_pct']:+.1f}%" if e['change_pct'] is not None else "-"
+        lines.append(f"| {metric} | {fmt(e['mean'])} | {value_range} | {fmt(e['prev_mean'])} | "
+                     f"{change} | {e['trend'] or '-'} | {e['days']} |")
+    return "\n".join(lines) + "\n"
+
+
+def init_worker(use_llm=False, ollama_url="http://localhost:11434", model="llama3.2:latest"):
+    if use_llm:
+        from src.chatbot.llm_client import OllamaClient
+        _llm['client'] = OllamaClient(model=model, base_url=ollama_url)
+
+
+def narrative(report: Dict) -> Optional[str]:
+    """A few sentences from the LLM, cached on the report's numbers; None when disabled or failing."""
+    client = _llm.get('client')
+    facts = report_facts(report)
+    if client is None or not facts:
+        return None
+    from src.chatbot.llm_client import ERROR_PREFIX
+    from src.data.llm_cache import LLMResponseCache, make_key
+    llm_cache = _llm.setdefault('cache', LLMResponseCache())
+    key = make_key('weekly_report', client.model, facts)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        return cached
+    prompt = ("Write a short, encouraging weekly health summary (3-4 sentences) for this user. "
+              "Mention what improved, what slipped and one suggestion for next week.\n\n" + facts)
+    text = client.generate(prompt, max_tokens=200)
+    if text.startswith(ERROR_PREFIX):
+        return None
+    llm_cache.put(key, client.model, 'weekly_report', text)
+    return text
+
+
+def run_shard(users: List[Tuple[str, str]], week_end: date, output_dir: str) -> List[Dict]:
+    """Compute and write reports for one shard of users; returns one index entry per user."""
+    start = week_end - timedelta(days=13)
+    user_index, offsets, values = load_shard(users, start, week_end)
+    aggregates = weekly_aggregates(user_index, offsets, values, len(users))
+    week_start = week_end - timedelta(days=6)
+    index = []
+    for i, (user, _) in enumerate(users):
+        report = user_report(user, week_start, week_end, aggregates, i)
+        report['narrative'] = narrative(report)
+        base = os.path.join(output_dir, user)
+        with open(base + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        with open(base + '.md', 'w') as f:
+            f.write(render_markdown(report))
+        index.append({'user': user, 'metrics': len(report['metrics']),
+                      'narrative': report['narrative'] is not None})
+    return index
+
+
+def generate_reports(users: List[Tuple[str, str]], week_end: date, output_dir: str = REPORTS_DIR,
+                     workers: Optional[int] = None, shard_size: int = 64, use_llm: bool = False,
+                     ollama_url: str = "http://localhost:11434", model: str = "llama3.2:latest") -> str:
+    """Write every user's report under output_dir/<week start>/; returns that directory."""
+    week_dir = os.path.join(output_dir, (week_end - timedelta(days=6)).isoformat())
+    os.makedirs(week_dir, exist_ok=True)
+    shards = [users[i:i + shard_size] for i in range(0, len(users), shard_size)]
+    worker_args = (use_llm, ollama_url, model)
+    index = []
+    if workers == 0:
+        init_worker(*worker_args)
+        for shard in shards:
+            index.extend(run_shard(shard, week_end, week_dir))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=worker_args) as pool:
+            for entries in pool.map(run_shard, shards, [week_end] * len(shards), [week_dir] * len(shards)):
+                index.extend(entries)
+    with open(os.path.join(week_dir, 'index.json'), 'w') as f:
+        json.dump({'week_end': week_end.isoformat(), 'users': index}, f, indent=2)
+    return week_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write weekly health reports for every user")
+    parser.add_argument('--users-dir', default=None,
+                        help='directory of <user>.db stores (default: the local store as user "me")')
+    parser.add_argument('--week-ending', type=date.fromisoformat, default=date.today() - timedelta(days=1),
+                        help='last day of the report week, YYYY-MM-DD (default: yesterday)')
+    parser.add_argument('--output-dir', default=REPORTS_DIR)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU; 0 for none)')
+    parser.add_argument('--shard-size', type=int, default=64, help='users per process task')
+    parser.add_argument('--llm', action='store_true', help='add an LLM-written narrative to each report')
+    parser.add_argument('--ollama-url', default="http://localhost:11434")
+    parser.add_argument('--model', default="llama3.2:latest")
+    args = parser.parse_args(argv)
+
+    users = discover_users(args.users_dir)
+    start = time.perf_counter()
+    week_dir = generate_reports(users, args.week_ending, args.output_dir, args.workers, args.shard_size,
+                                args.llm, args.ollama_url, args.model)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(users)} reports to {week_dir} in {elapsed:.2f}s "
+          f"({len(users) / elapsed if elapsed else 0:.0f} users/s)")
+
+
+if __name__ == "__main__":
+    main()